@@ -0,0 +1,111 @@
+import re
+import functools
+from enum import IntFlag
+from typing import Optional, Tuple
+
+class API(IntFlag):
+    """Bitmask of the external APIs a task can be enriched with"""
+    WEB_SEARCH = 1
+    NEWS = 2
+    WEATHER = 4
+    GEOLOCATION = 8
+    STOCK_DATA = 16
+    WIKIPEDIA = 32
+
+# Shared empty "apis_used" value for tasks without enrichments
+_NO_APIS_USED = ()
+
+# Selection flag name used in task kwargs and "apis_used" for each API
+API_NAMES = {
+    API.WEB_SEARCH: "use_web_search",
+    API.NEWS: "use_news",
+    API.WEATHER: "use_weather",
+    API.GEOLOCATION: "use_geolocation",
+    API.STOCK_DATA: "use_stock_data",
+    API.WIKIPEDIA: "use_wikipedia",
+}
+
+def _trie_pattern(words):
+    """
+    Build a regex alternation for words factored as a prefix trie, so the engine
+    follows a single branch per character instead of retrying every keyword
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def _build(node):
+        branches = [re.escape(char) + _build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        optional = "" in node
+        if len(branches) == 1 and not optional:
+            return branches[0]
+        # Longer matches first so a keyword is preferred over its own prefix
+        return "(?:" + "|".join(branches) + ")" + ("?" if optional else "")
+
+    return _build(trie)
+
+# Keyword triggers for each external API, matched as substrings of the lowered task
+_API_KEYWORDS = {
+    API.WEB_SEARCH: ("research", "find", "search", "information", "about", "what is", "how to", "explain"),
+    API.NEWS: ("news", "latest", "recent", "current", "today", "trend"),
+    API.WEATHER: ("weather", "temperature", "climate"),
+    API.GEOLOCATION: ("location", "geolocation", "ip", "where am i"),
+    API.STOCK_DATA: ("stock", "share price", "market value"),
+    API.WIKIPEDIA: ("define", "meaning", "history", "biography", "scientist", "inventor", "theory"),
+}
+_KEYWORD_TO_API = {keyword: api for api, keywords in _API_KEYWORDS.items() for keyword in keywords}
+# Zero-width lookahead so overlapping keywords (e.g. "search" inside "research") are all seen in one pass
+_KEYWORD_RE = re.compile("(?=(" + _trie_pattern(_KEYWORD_TO_API) + "))")
+_CITY_RE = re.compile(r"(?<!\S)(?:in|at|for)\s+(?=(\S+))")
+_STOCK_SYMBOL_RE = re.compile(r"\$\s*([^\s$]+)")
+
+@functools.lru_cache(maxsize=1024)
+def select_apis(task_description: str) -> Tuple[API, Optional[str], Optional[str], Optional[str]]:
+    """
+    Automatically determine which APIs to use based on task content.
+    Returns (mask, city, stock_symbol, wikipedia_query); memoized on the task description.
+    """
+    task_lower = task_description.lower()
+    mask = API(0)
+    city = None
+    stock_symbol = None
+    wikipedia_query = None
+
+    # Single scan over the task flags every API whose keywords appear in it
+    for keyword in _KEYWORD_RE.findall(task_lower):
+        mask |= _KEYWORD_TO_API[keyword]
+
+    # Weather: extract the word following the last "in"/"at"/"for" as the city
+    if mask & API.WEATHER:
+        cities = _CITY_RE.findall(task_lower)
+        if cities:
+            city = cities[-1].capitalize()
+
+    # Stock data: extract the symbol following "$"
+    if mask & API.STOCK_DATA:
+        match = _STOCK_SYMBOL_RE.search(task_lower)
+        if match:
+            stock_symbol = match.group(1).upper()
+
+    # Wikipedia: extract the search term after "who is"/"what is"
+    if mask & API.WIKIPEDIA:
+        if "who is" in task_lower:
+            wikipedia_query = task_lower.split("who is", 2)[1].strip()
+        elif "what is" in task_lower:
+            wikipedia_query = task_lower.split("what is", 2)[1].strip()
+        else:
+            # Use the entire task as query if no specific pattern
+            wikipedia_query = task_description[:50]  # Limit length
+
+    return mask, city, stock_symbol, wikipedia_query
+
+def apis_used(mask: API) -> Tuple[str, ...]:
+    """Selection flag names of the APIs enabled in mask"""
+    if not mask:
+        return _NO_APIS_USED
+    return tuple(name for flag, name in API_NAMES.items() if mask & flag)
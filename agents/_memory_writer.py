@@ -0,0 +1,56 @@
+import atexit
+import threading
+
+class MemoryWriter:
+    """Buffers Mem0 writes and sends them from a background thread
+
+    The buffer is flushed every FLUSH_INTERVAL seconds, or sooner once FLUSH_AT writes are waiting,
+    with one add() call per client and user. A write's on_written callback runs once its batch
+    has been stored, so callers can invalidate anything cached from before it.
+    """
+    FLUSH_AT = 8
+    FLUSH_INTERVAL = 2.0
+
+    def __init__(self):
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def add(self, client, user_id: str, message: str, on_written=None):
+        with self._lock:
+            self._buffer.append((client, user_id, message, on_written))
+            full = len(self._buffer) >= self.FLUSH_AT
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="mem0-writer", daemon=True)
+                self._thread.start()
+        if full:
+            self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.FLUSH_INTERVAL)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            buffered, self._buffer = self._buffer, []
+        batches = {}
+        for client, user_id, message, on_written in buffered:
+            _, messages, callbacks = batches.setdefault((id(client), user_id), (client, [], []))
+            messages.append({"role": "user", "content": message})
+            if on_written:
+                callbacks.append(on_written)
+        for (_, user_id), (client, messages, callbacks) in batches.items():
+            try:
+                client.add(messages, user_id=user_id)
+            except Exception as e:
+                print(f"Warning: Failed to write Mem0 memories: {e}")
+                continue
+            for on_written in callbacks:
+                on_written()
+
+# Shared by every agent, so writes from different agents for the same client and user go out together
+MEMORY_WRITER = MemoryWriter()
+atexit.register(MEMORY_WRITER.flush)
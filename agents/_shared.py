@@ -0,0 +1,81 @@
+import os
+import re
+import atexit
+import functools
+
+def langfuse_disabled():
+    return os.getenv("LANGFUSE_DISABLED", "").strip().lower() in ("1", "true", "yes")
+
+@functools.lru_cache(maxsize=1)
+def get_langfuse():
+    """Langfuse client shared by the agents, the external APIs and the orchestrator, or None when
+    tracing is unavailable, unconfigured or disabled. Events are queued in-process and exported in
+    batches by background threads."""
+    if not os.getenv("LANGFUSE_PUBLIC_KEY") or langfuse_disabled():
+        return None
+    try:
+        from langfuse import Langfuse
+        return Langfuse(
+            public_key=os.getenv("LANGFUSE_PUBLIC_KEY"),
+            secret_key=os.getenv("LANGFUSE_SECRET_KEY"),
+            host=os.getenv("LANGFUSE_HOST", "https://cloud.langfuse.com"),
+            # Export in larger, less frequent batches
+            flush_at=50,
+            flush_interval=5,
+            threads=2
+        )
+    except ImportError:
+        return None
+    except Exception as e:
+        print(f"Warning: Langfuse initialization failed: {e}")
+        return None
+
+def _flush_langfuse():
+    """Drain queued events before the interpreter exits"""
+    # Only flush a client that was actually built; don't construct one at exit
+    if not get_langfuse.cache_info().currsize:
+        return
+    langfuse = get_langfuse()
+    if langfuse:
+        try:
+            langfuse.flush()
+        except Exception as e:
+            print(f"Warning: Failed to flush Langfuse: {e}")
+
+# Registered on import, before any agent's Langfuse worker pool, so at exit the pools are drained
+# first and whatever they exported is flushed here
+atexit.register(_flush_langfuse)
+
+@functools.lru_cache(maxsize=1)
+def get_mem0_client():
+    """Mem0 memory client shared by the agents, or None without mem0 or an M0_API_KEY"""
+    mem0_api_key = os.getenv("M0_API_KEY")
+    if not mem0_api_key:
+        return None
+    try:
+        from mem0 import MemoryClient
+        return MemoryClient(api_key=mem0_api_key)
+    except ImportError:
+        return None
+    except Exception as e:
+        print(f"Warning: Mem0 initialization failed: {e}")
+        return None
+
+def json_default(obj):
+    """JSON fallback for values the encoders don't handle"""
+    # NumPy arrays (the Streamlit app sends float64 data) serialize as plain lists, so equal
+    # arrays also hash equal rather than by their abbreviated repr
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    return str(obj)
+
+_MODERATION_RE = re.compile(r"moderation|flagged", re.IGNORECASE)
+
+def is_moderation_error(e: Exception) -> bool:
+    """Whether an LLM call failed because the provider's content moderation rejected it"""
+    message = str(e)
+    # Provider exceptions (openai/litellm) carry the HTTP status; only sniff the message without one
+    status_code = getattr(e, "status_code", None)
+    if status_code is not None:
+        return status_code == 403 and _MODERATION_RE.search(message) is not None
+    return "403" in message and _MODERATION_RE.search(message) is not None
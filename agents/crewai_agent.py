@@ -1,21 +1,78 @@
 import os
+import atexit
+import asyncio
+import uuid
+import hashlib
+import functools
 from dotenv import load_dotenv
-from typing import Optional, Any, Dict
-from crewai import Agent, Task, Crew, LLM
-from crewai.process import Process
+from typing import Optional, Any, Dict, List
 from textwrap import dedent
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from agents.external_apis import ExternalAPIs
+from agents._shared import get_langfuse as _get_langfuse, is_moderation_error as _is_moderation_error
+from agents._api_router import API, API_NAMES, select_apis, apis_used as _apis_used
 
 # Load environment variables
 load_dotenv()
 
+# Task description wrapper, dedented once at import time
+_TASK_TEMPLATE = dedent("""
+    {body}
+
+    Consider using external data sources when relevant to enhance your research.
+    Focus on accuracy and relevance to the task.
+""")
+
+@functools.lru_cache(maxsize=1)
+def _lazy_crewai():
+    """Import CrewAI on first use; it pulls in heavy transitive dependencies"""
+    from crewai import Agent, Task, Crew, LLM
+    from crewai.process import Process
+    return Agent, Task, Crew, LLM, Process
+
+@functools.lru_cache(maxsize=1)
+def _get_external_apis():
+    """Shared ExternalAPIs instance (and its keep-alive session) for all CrewAI agents"""
+    return ExternalAPIs()
+
+# Background pool for Langfuse exports so tracing stays off the request path
+_LANGFUSE_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="langfuse")
+
+# Drained at exit before the shared client is flushed (see agents/_shared.py)
+atexit.register(_LANGFUSE_EXECUTOR.shutdown, wait=True)
+
+def _create_generation(trace, **kwargs):
+    """Create a Langfuse generation on a background thread"""
+    try:
+        return trace.generation(**kwargs)
+    except Exception as e:
+        print(f"Warning: Failed to create Langfuse generation: {e}")
+        return None
+
+def _update_generation(generation_future, **kwargs):
+    """Update a Langfuse generation once its creation has finished"""
+    try:
+        generation = generation_future.result()
+    except Exception as e:
+        print(f"Warning: Failed to create Langfuse generation: {e}")
+        return
+    if generation:
+        try:
+            generation.update(**kwargs)
+        except Exception as e:
+            print(f"Warning: Failed to update Langfuse generation: {e}")
+
 class RealCrewAIAgent:
-    def __init__(self, role, goal, backstory):
+    _EXPECTED_OUTPUT = "A comprehensive response to the task with relevant information and insights."
+    _FALLBACK_EXPECTED_OUTPUT = "A concise, professional response to the task."
+
+    def __init__(self, role, goal, backstory, verbose: bool = False):
         self.role = role
         self.goal = goal
         self.backstory = backstory
+        self.verbose = verbose
         self.api_key = os.getenv("OPENROUTER_API_KEY")
-        self.external_apis = ExternalAPIs()
+        self.external_apis = _get_external_apis()
         
         # Initialize MCP client if available
         try:
@@ -26,17 +83,19 @@ class RealCrewAIAgent:
             self.mcp_client = None
             
         # Initialize Langfuse for observability
+        self.langfuse = _get_langfuse()
+        
+        # Head-based trace sampling rate in [0, 1]
         try:
-            from langfuse import Langfuse
-            self.langfuse = Langfuse(
-                public_key=os.getenv("LANGFUSE_PUBLIC_KEY"),
-                secret_key=os.getenv("LANGFUSE_SECRET_KEY"),
-                host=os.getenv("LANGFUSE_HOST", "https://cloud.langfuse.com")
-            )
-        except ImportError:
-            self.langfuse = None
-        except Exception as e:
-            print(f"Warning: Langfuse initialization failed: {e}")
+            self._sample_rate = float(os.getenv("LANGFUSE_SAMPLE_RATE", "1.0"))
+        except ValueError:
+            print("Warning: Invalid LANGFUSE_SAMPLE_RATE, defaulting to 1.0")
+            self._sample_rate = 1.0
+        if not 0.0 <= self._sample_rate <= 1.0:
+            print(f"Warning: LANGFUSE_SAMPLE_RATE must be between 0 and 1, got {self._sample_rate}")
+            self._sample_rate = min(max(self._sample_rate, 0.0), 1.0)
+        
+        Agent, _, _, LLM, _ = _lazy_crewai()
         
         # Create the LLM with OpenRouter configuration
         if self.api_key:
@@ -54,73 +113,80 @@ class RealCrewAIAgent:
             role=role,
             goal=goal,
             backstory=backstory,
-            verbose=True,
+            verbose=verbose,
             allow_delegation=False,
             llm=self.llm
         )
         
-    def auto_select_apis(self, task_description):
-        """Automatically determine which APIs to use based on task content"""
-        task_lower = task_description.lower()
-        apis_to_use = {
-            "use_web_search": False,
-            "use_news": False,
-            "use_weather": False,
-            "use_geolocation": False,
-            "use_stock_data": False,
-            "use_wikipedia": False,
-            "city": None,
-            "stock_symbol": None,
-            "wikipedia_query": None
-        }
+    # Keyword-based API selection, shared with anything else that routes research tasks
+    auto_select_apis = staticmethod(select_apis)
 
-        # Web search for general research queries
-        if any(keyword in task_lower for keyword in ["research", "find", "search", "information", "about", "what is", "how to", "explain"]):
-            apis_to_use["use_web_search"] = True
+    def _enhance_task(self, task_description, mask, city, ip_address, stock_symbol, wikipedia_query) -> str:
+        """Fetch the selected external data concurrently and append it to the task"""
+        # Collect the enabled enrichment calls so they can run concurrently
+        api_calls = []
+        if mask & API.WEB_SEARCH:
+            api_calls.append(("web_search", self.external_apis.tavily_search, (task_description,)))
+        if mask & API.NEWS:
+            api_calls.append(("news", self.external_apis.get_news, ()))
+        if mask & API.WEATHER and city:
+            api_calls.append(("weather", self.external_apis.get_weather, (city,)))
+        if mask & API.GEOLOCATION:
+            api_calls.append(("geolocation", self.external_apis.get_geolocation, (ip_address or "",)))
+        if mask & API.STOCK_DATA and stock_symbol:
+            api_calls.append(("stock_data", self.external_apis.get_stock_data, (stock_symbol,)))
+        if mask & API.WIKIPEDIA and wikipedia_query:
+            api_calls.append(("wikipedia", self.external_apis.search_wikipedia, (wikipedia_query,)))
+        if not api_calls:
+            return task_description
 
-        # News for current events
-        if any(keyword in task_lower for keyword in ["news", "latest", "recent", "current", "today", "trend"]):
-            apis_to_use["use_news"] = True
-
-        # Weather for location-based queries
-        if any(keyword in task_lower for keyword in ["weather", "temperature", "climate"]):
-            apis_to_use["use_weather"] = True
-            # Try to extract city name
-            words = task_lower.split()
-            for i, word in enumerate(words):
-                if word in ["in", "at", "for"] and i + 1 < len(words):
-                    apis_to_use["city"] = words[i + 1].capitalize()
-
-        # Geolocation for IP-based queries
-        if any(keyword in task_lower for keyword in ["location", "geolocation", "ip", "where am i"]):
-            apis_to_use["use_geolocation"] = True
+        api_results = {}
+        with ThreadPoolExecutor(max_workers=len(api_calls)) as executor:
+            futures = {executor.submit(fn, *args): key for key, fn, args in api_calls}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                    api_results[futures[future]] = result["data"] if result["data"] is not None else result["error"]
+                except Exception as e:
+                    api_results[futures[future]] = f"API Error: {str(e)}"
 
-        # Stock data for financial queries
-        if any(keyword in task_lower for keyword in ["stock", "share price", "market value"]):
-            apis_to_use["use_stock_data"] = True
-            # Try to extract stock symbol (simple pattern matching)
-            if "$" in task_lower:
-                parts = task_lower.split("$")
-                if len(parts) > 1:
-                    apis_to_use["stock_symbol"] = parts[1].split()[0].upper()
+        # Build the prompt in a fixed order, independent of completion order
+        parts = [f"Task: {task_description}"]
+        if "web_search" in api_results:
+            parts.append(f"Relevant web search results: {api_results['web_search']}")
+        if "news" in api_results:
+            parts.append(f"Latest tech news: {api_results['news']}")
+        if "weather" in api_results:
+            parts.append(f"Weather in {city}: {api_results['weather']}")
+        if "geolocation" in api_results:
+            parts.append(f"Geolocation info: {api_results['geolocation']}")
+        if "stock_data" in api_results:
+            parts.append(f"Stock data for {stock_symbol}: {api_results['stock_data']}")
+        if "wikipedia" in api_results:
+            parts.append(f"Wikipedia info: {api_results['wikipedia']}")
+        return "\n\n".join(parts)
 
-        # Wikipedia for definitions and encyclopedic information
-        if any(keyword in task_lower for keyword in ["define", "meaning", "history", "biography", "scientist", "inventor", "theory"]):
-            apis_to_use["use_wikipedia"] = True
-            # Try to extract search term
-            if "who is" in task_lower:
-                parts = task_lower.split("who is")
-                if len(parts) > 1:
-                    apis_to_use["wikipedia_query"] = parts[1].strip()
-            elif "what is" in task_lower:
-                parts = task_lower.split("what is")
-                if len(parts) > 1:
-                    apis_to_use["wikipedia_query"] = parts[1].strip()
-            else:
-                # Use the entire task as query if no specific pattern
-                apis_to_use["wikipedia_query"] = task_description[:50]  # Limit length
+    def _run_crew(self, description: str, expected_output: str):
+        """Run a single-task sequential crew for this agent"""
+        # A fresh Task/Crew per run keeps concurrent run_batch executions independent
+        _, Task, Crew, _, Process = _lazy_crewai()
+        task = Task(description=description, agent=self.agent, expected_output=expected_output)
+        crew = Crew(
+            agents=[self.agent],
+            tasks=[task],
+            process=Process.sequential,
+            verbose=self.verbose
+        )
+        return crew.kickoff()
 
-        return apis_to_use
+    def _is_sampled(self, trace_id: str) -> bool:
+        """Deterministically decide whether a trace id falls inside the sample rate"""
+        if self._sample_rate >= 1.0:
+            return True
+        if self._sample_rate <= 0.0:
+            return False
+        digest = hashlib.blake2b(trace_id.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big") / 2**64 < self._sample_rate
 
     def execute_task(self, task_description: str, auto_api_selection=True, **kwargs) -> Dict[str, Any]:
         """
@@ -128,9 +194,11 @@ class RealCrewAIAgent:
         """
         # Start Langfuse trace if available
         trace = None
-        if self.langfuse:
+        trace_id = str(uuid.uuid4())
+        if self.langfuse and self._is_sampled(trace_id):
             try:
                 trace = self.langfuse.trace(
+                    id=trace_id,
                     name="crewai-agent-task",
                     user_id="default_user",
                     metadata={
@@ -144,146 +212,77 @@ class RealCrewAIAgent:
         
         # Automatically select APIs if enabled
         if auto_api_selection:
-            api_selection = self.auto_select_apis(task_description)
-            # Override with any manually provided kwargs
-            api_selection.update(kwargs)
+            mask, city, stock_symbol, wikipedia_query = self.auto_select_apis(task_description)
         else:
-            # Use manually provided kwargs or defaults
-            api_selection = {
-                "use_web_search": kwargs.get("use_web_search", False),
-                "use_news": kwargs.get("use_news", False),
-                "use_weather": kwargs.get("use_weather", False),
-                "use_geolocation": kwargs.get("use_geolocation", False),
-                "use_stock_data": kwargs.get("use_stock_data", False),
-                "use_wikipedia": kwargs.get("use_wikipedia", False),
-                "city": kwargs.get("city"),
-                "ip_address": kwargs.get("ip_address"),
-                "stock_symbol": kwargs.get("stock_symbol"),
-                "wikipedia_query": kwargs.get("wikipedia_query")
-            }
+            mask, city, stock_symbol, wikipedia_query = API(0), None, None, None
 
-        # Extract API parameters
-        use_web_search = api_selection["use_web_search"]
-        use_news = api_selection["use_news"]
-        use_weather = api_selection["use_weather"]
-        use_geolocation = api_selection["use_geolocation"]
-        use_stock_data = api_selection["use_stock_data"]
-        use_wikipedia = api_selection["use_wikipedia"]
-        city = api_selection["city"]
-        ip_address = api_selection.get("ip_address")
-        stock_symbol = api_selection["stock_symbol"]
-        wikipedia_query = api_selection["wikipedia_query"]
+        # Override with any manually provided kwargs
+        for flag, name in API_NAMES.items():
+            if name in kwargs:
+                mask = mask | flag if kwargs[name] else mask & ~flag
+        city = kwargs.get("city", city)
+        ip_address = kwargs.get("ip_address")
+        stock_symbol = kwargs.get("stock_symbol", stock_symbol)
+        wikipedia_query = kwargs.get("wikipedia_query", wikipedia_query)
+        apis_used = _apis_used(mask)
 
-        # Enhance task with external data if requested
+        # Fast path: skip the enrichment machinery entirely when no API is selected
         enhanced_task = task_description
+        if mask:
+            enhanced_task = self._enhance_task(task_description, mask, city, ip_address, stock_symbol, wikipedia_query)
 
-        if use_web_search:
-            search_results = self.external_apis.tavily_search(task_description)
-            enhanced_task = f"Task: {task_description}\n\nRelevant web search results: {search_results}"
-        if use_news:
-            news_results = self.external_apis.get_news()
-            enhanced_task = f"Task: {task_description}\n\nLatest tech news: {news_results}"
-
-        if use_weather and city:
-            weather_results = self.external_apis.get_weather(city)
-            enhanced_task = f"Task: {task_description}\n\nWeather in {city}: {weather_results}"
-
-        if use_geolocation:
-            geo_results = self.external_apis.get_geolocation(ip_address or "")
-            enhanced_task = f"Task: {task_description}\n\nGeolocation info: {geo_results}"
-
-        if use_stock_data and stock_symbol:
-            stock_results = self.external_apis.get_stock_data(stock_symbol)
-            enhanced_task = f"Task: {task_description}\n\nStock data for {stock_symbol}: {stock_results}"
-            
-        if use_wikipedia and wikipedia_query:
-            wiki_results = self.external_apis.search_wikipedia(wikipedia_query)
-            enhanced_task = f"Task: {task_description}\n\nWikipedia info: {wiki_results}"
-
-        # Create a task for the agent with enhanced context
-        task = Task(
-            description=dedent(f"""
-                {enhanced_task}
-                
-                Consider using external data sources when relevant to enhance your research.
-                Focus on accuracy and relevance to the task.
-            """),
-            agent=self.agent,
-            expected_output="A comprehensive response to the task with relevant information and insights."
-        )
+        # Describe the task for the agent with enhanced context
+        description = _TASK_TEMPLATE.format(body=enhanced_task)
         
-        # Add Langfuse generation tracing if available
-        generation = None
+        # Add Langfuse generation tracing if available (exported in the background)
+        generation_future = None
         if trace:
-            try:
-                generation = trace.generation(
-                    name="crewai-task-execution",
-                    model="meta-llama/llama-4-maverick:free",
-                    input={
-                        "task_description": task_description,
-                        "enhanced_task": enhanced_task,
-                        "auto_api_selection": auto_api_selection
-                    }
-                )
-            except Exception as e:
-                print(f"Warning: Failed to create Langfuse generation: {e}")
-        
-        # Create a crew with just this agent
-        crew = Crew(
-            agents=[self.agent],
-            tasks=[task],
-            process=Process.sequential,
-            verbose=True
-        )
+            generation_future = _LANGFUSE_EXECUTOR.submit(
+                _create_generation,
+                trace,
+                name="crewai-task-execution",
+                model="meta-llama/llama-4-maverick:free",
+                input={
+                    "task_description": task_description,
+                    "enhanced_task": enhanced_task,
+                    "auto_api_selection": auto_api_selection
+                }
+            )
         
         try:
-            # Execute the task
-            result = crew.kickoff()
+            # Execute the task with a crew of just this agent
+            result = self._run_crew(description, self._EXPECTED_OUTPUT)
             
             # Update Langfuse generation with output if available
-            if generation:
-                try:
-                    generation.update(
-                        output=str(result),
-                        metadata={
-                            "apis_used": [k for k, v in api_selection.items() if v and k.startswith("use_")],
-                            "task_completed": True
-                        }
-                    )
-                except Exception as e:
-                    print(f"Warning: Failed to update Langfuse generation: {e}")
+            if generation_future:
+                _LANGFUSE_EXECUTOR.submit(
+                    _update_generation,
+                    generation_future,
+                    output=str(result),
+                    metadata={
+                        "apis_used": apis_used,
+                        "task_completed": True
+                    }
+                )
             
             return {
                 "content": str(result),
                 "agent": self.role,
                 "task": task_description,
-                "apis_used": [k for k, v in api_selection.items() if v and k.startswith("use_")]
+                "apis_used": apis_used
             }
         except Exception as e:
             # Handle content moderation errors specifically
-            error_str = str(e).lower()
-            if "403" in error_str and ("moderation" in error_str or "flagged" in error_str):
+            if _is_moderation_error(e):
                 # Try with a simpler task description
                 try:
-                    simple_task = Task(
-                        description=task_description,  # Use the original task without enhancements
-                        agent=self.agent,
-                        expected_output="A concise, professional response to the task."
-                    )
-                    
-                    simple_crew = Crew(
-                        agents=[self.agent],
-                        tasks=[simple_task],
-                        process=Process.sequential,
-                        verbose=True
-                    )
-                    
-                    simple_result = simple_crew.kickoff()
+                    # Use the original task without enhancements
+                    simple_result = self._run_crew(task_description, self._FALLBACK_EXPECTED_OUTPUT)
                     return {
                         "content": str(simple_result),
                         "agent": self.role,
                         "task": task_description,
-                        "apis_used": [k for k, v in api_selection.items() if v and k.startswith("use_")],
+                        "apis_used": apis_used,
                         "fallback_used": True
                     }
                 except Exception as fallback_e:
@@ -291,12 +290,42 @@ class RealCrewAIAgent:
                         "error": f"Error executing task (fallback also failed): {str(e)} | Fallback error: {str(fallback_e)}",
                         "agent": self.role,
                         "task": task_description,
-                        "apis_used": [k for k, v in api_selection.items() if v and k.startswith("use_")]
+                        "apis_used": apis_used
                     }
             else:
                 return {
                     "error": f"Error executing task: {str(e)}",
                     "agent": self.role,
                     "task": task_description,
-                    "apis_used": [k for k, v in api_selection.items() if v and k.startswith("use_")]
+                    "apis_used": apis_used
                 }
+
+    def run_batch(self, task_descriptions: List[str], concurrency: int = 10, auto_api_selection=True, **kwargs) -> List[Dict[str, Any]]:
+        """
+        Execute several tasks concurrently, returning results in the same order as the inputs
+        """
+        if not task_descriptions:
+            return []
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(task_descriptions)))) as executor:
+            return list(executor.map(
+                lambda task_description: self.execute_task(task_description, auto_api_selection=auto_api_selection, **kwargs),
+                task_descriptions
+            ))
+
+    async def execute_task_async(self, task_description: str, auto_api_selection=True, **kwargs) -> Dict[str, Any]:
+        """
+        Async variant of execute_task; runs the blocking CrewAI call in a worker thread
+        """
+        return await asyncio.to_thread(self.execute_task, task_description, auto_api_selection, **kwargs)
+
+    async def run_batch_async(self, task_descriptions: List[str], concurrency: int = 10, auto_api_selection=True, **kwargs) -> List[Dict[str, Any]]:
+        """
+        Execute several tasks concurrently from an event loop, at most `concurrency` at a time
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def _one(task_description):
+            async with semaphore:
+                return await self.execute_task_async(task_description, auto_api_selection, **kwargs)
+
+        return list(await asyncio.gather(*(_one(task_description) for task_description in task_descriptions)))
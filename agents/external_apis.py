@@ -1,290 +1,880 @@
 import os
+import re
+import functools
+import json
+import hashlib
+import socket
 import requests
-import wikipediaapi
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.retry import Retry
+import asyncio
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from types import MappingProxyType
+from dataclasses import dataclass
+from urllib.parse import urlsplit
 from dotenv import load_dotenv
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, TypedDict
+from agents._shared import get_langfuse as _get_langfuse
+
+# httpx is optional; without it the async methods run the sync calls in worker threads
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# h2 is optional; with it the async client multiplexes concurrent calls to one host over HTTP/2
+try:
+    import h2
+except ImportError:
+    h2 = None
+
+# orjson is optional; it decodes upstream JSON several times faster than the stdlib
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# redis is optional; without it responses are only cached in-process
+try:
+    import redis
+except ImportError:
+    redis = None
 
 # Load environment variables
 load_dotenv()
 
+def _loads(raw):
+    """Decode JSON from bytes or str"""
+    return orjson.loads(raw) if orjson else json.loads(raw)
+
+def _dumps(obj):
+    """Encode JSON to bytes"""
+    return orjson.dumps(obj) if orjson else json.dumps(obj).encode()
+
+def _json(response):
+    """Decode a requests/httpx response body straight from its raw bytes"""
+    return _loads(response.content)
+
+# Prompts asking for current information are never answered from the Gemini cache
+_FRESHNESS_RE = re.compile(r"\b(?:today|tonight|now|latest|current|currently|recent|breaking|this week)\b", re.I)
+
+# Sentinel for a cache miss, since None can be a legitimate cached value
+_MISS = object()
+
+class _TTLCache:
+    """Thread-safe LRU cache whose entries expire a fixed number of seconds after being stored"""
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISS
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return _MISS
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+async def _close_on_shutdown(client, on_closed):
+    # Parked at the yield; the loop's shutdown_asyncgens() (run by asyncio.run) closes the client
+    try:
+        yield
+    finally:
+        on_closed()
+        await client.aclose()
+
+class _LoopClients:
+    """Async HTTP clients made by factory(), one per event loop
+
+    An httpx.AsyncClient can only be used on the loop it was first used on. Each loop's client is
+    closed when the loop shuts down its async generators, as asyncio.run does; clients of loops
+    closed without doing so are dropped the next time a client is made.
+    """
+    def __init__(self, factory):
+        self._factory = factory
+        self._clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    async def get(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._clients.get(loop)
+            if entry is not None:
+                return entry[0]
+            # The closer refers back to its loop, so entries don't go away with their loops
+            for closed in [other for other in self._clients if other.is_closed()]:
+                del self._clients[closed]
+            client = self._factory()
+            closer = _close_on_shutdown(client, functools.partial(self._discard, loop))
+            self._clients[loop] = (client, closer)
+        await closer.__anext__()
+        return client
+
+    def _discard(self, loop):
+        with self._lock:
+            self._clients.pop(loop, None)
+
+class _CircuitBreaker:
+    """Fails fast once an upstream has failed fail_max times in a row; after reset_timeout seconds
+    one trial call is let through, and its outcome closes or re-opens the circuit"""
+    def __init__(self, fail_max: int = 5, reset_timeout: float = 30):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if not self._trial and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._trial = True
+                return True
+            return False
+
+    def success(self) -> bool:
+        """Record a success; returns True if this closed an open circuit"""
+        with self._lock:
+            was_open = self._opened_at is not None
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+            return was_open
+
+    def failure(self) -> bool:
+        """Record a failure; returns True if this opened the circuit"""
+        with self._lock:
+            self._failures += 1
+            if self._opened_at is not None:
+                # The half-open trial failed; wait another reset_timeout
+                self._opened_at = time.monotonic()
+                self._trial = False
+                return False
+            if self._failures >= self.fail_max:
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+    def release(self):
+        """Record a call that proved nothing either way; an open circuit lets the next trial through"""
+        with self._lock:
+            self._trial = False
+
+# DNS answers for the hosts the API session talks to, so each is resolved once per TTL. Only
+# connections made through _CachedDNSAdapter use it; the rest of the process resolves as usual.
+_DNS_TTL = 300
+_DNS_CACHE = _TTLCache(maxsize=64, ttl=_DNS_TTL)
+
+def _resolve(host, port):
+    """socket.getaddrinfo for TCP, cached for _DNS_TTL seconds"""
+    infos = _DNS_CACHE.get((host, port))
+    if infos is _MISS:
+        infos = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        _DNS_CACHE.set((host, port), infos)
+    return infos
+
+class _CachedDNSConnectionMixin:
+    """Opens the socket to an address from _resolve. Only the address is swapped, and only while
+    connecting; TLS still verifies the certificate against the hostname."""
+    def _new_conn(self):
+        host = self._dns_host
+        try:
+            infos = _resolve(host, self.port)
+        except OSError:
+            return super()._new_conn()
+        error = None
+        for *_, sockaddr in infos:
+            self._dns_host = sockaddr[0]
+            try:
+                return super()._new_conn()
+            except (NewConnectionError, ConnectTimeoutError) as e:
+                error = e
+            finally:
+                self._dns_host = host
+        raise error
+
+class _CachedDNSHTTPConnection(_CachedDNSConnectionMixin, HTTPConnection):
+    pass
+
+class _CachedDNSHTTPSConnection(_CachedDNSConnectionMixin, HTTPSConnection):
+    pass
+
+class _CachedDNSHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _CachedDNSHTTPConnection
+
+class _CachedDNSHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _CachedDNSHTTPSConnection
+
+class _CachedDNSAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools resolve hosts through _resolve"""
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CachedDNSHTTPConnectionPool,
+            "https": _CachedDNSHTTPSConnectionPool,
+        }
+
+@functools.lru_cache(maxsize=1)
+def _warm_dns(urls):
+    """Resolve the given URLs' hosts on a background thread, once per process"""
+    def resolve_all():
+        for url in urls:
+            parts = urlsplit(url)
+            try:
+                _resolve(parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+            except OSError:
+                pass
+    threading.Thread(target=resolve_all, name="dns-warmup", daemon=True).start()
+
+class APIResult(TypedDict):
+    """Uniform return value of the ExternalAPIs methods. ok is False when the upstream call failed;
+    data then holds a stale copy if one was available (stale=True), otherwise error explains why."""
+    ok: bool
+    data: Any
+    error: Optional[str]
+    status: Optional[int]
+    cached: bool
+    stale: bool
+
+@dataclass(frozen=True)
+class APIConfig:
+    """API keys and connection settings for ExternalAPIs, read from the environment once"""
+    __slots__ = (
+        "google_api_key", "tavily_api_key", "news_api_key", "openweather_api_key",
+        "ip_geolocation_api_key", "alpha_vantage_api_key", "redis_url"
+    )
+    google_api_key: Optional[str]
+    tavily_api_key: Optional[str]
+    news_api_key: Optional[str]
+    openweather_api_key: Optional[str]
+    ip_geolocation_api_key: Optional[str]
+    alpha_vantage_api_key: Optional[str]
+    redis_url: Optional[str]
+
+    @classmethod
+    def from_env(cls) -> "APIConfig":
+        return cls(
+            google_api_key=os.getenv("GOOGLE_API_KEY"),
+            tavily_api_key=os.getenv("TAVILY_API_KEY"),
+            news_api_key=os.getenv("NEWS_API_KEY"),
+            openweather_api_key=os.getenv("OPENWEATHER_API_KEY"),
+            ip_geolocation_api_key=os.getenv("IP_GEOLOCATION_API_KEY"),
+            alpha_vantage_api_key=os.getenv("ALPHA_VANTAGE_API_KEY"),
+            redis_url=os.getenv("REDIS_URL")
+        )
+
 class ExternalAPIs:
-    def __init__(self):
-        self.google_api_key = os.getenv("GOOGLE_API_KEY")
-        self.tavily_api_key = os.getenv("TAVILY_API_KEY")
-        self.news_api_key = os.getenv("NEWS_API_KEY")
-        self.openweather_api_key = os.getenv("OPENWEATHER_API_KEY")
-        self.ip_geolocation_api_key = os.getenv("IP_GEOLOCATION_API_KEY")
-        self.alpha_vantage_api_key = os.getenv("ALPHA_VANTAGE_API_KEY")
+    __slots__ = (
+        "cfg", "session", "redis", "langfuse",
+        "_tavily_headers", "_news_headers", "_gemini_headers",
+        "_news_params", "_weather_params", "_stock_params", "_geolocation_url",
+        "_caches", "_validators", "_aclients",
+        "_inflight", "_ainflight", "_inflight_lock", "_breakers", "_breakers_lock", "_latencies"
+    )
+
+    # Response cache lifetime per endpoint, in seconds
+    CACHE_TTLS = {
+        "tavily": 300,
+        "news": 300,
+        "weather": 600,
+        "geolocation": 86400,
+        "stock": 60,
+        "wikipedia": 3600,
+        "gemini": 86400,
+    }
+    CACHE_MAXSIZE = 256
+    # Per-endpoint overrides of CACHE_MAXSIZE
+    CACHE_MAXSIZES = {"gemini": 512}
+    # Endpoints that send ETag/Last-Modified; once their cache entry expires they are revalidated
+    # with a conditional request for up to REVALIDATE_FOR times their TTL instead of refetched
+    CONDITIONAL_ENDPOINTS = ("news", "wikipedia")
+    REVALIDATE_FOR = 12
+    # (connect, read) timeouts per upstream, in seconds; connect stalls fail fast and trip the breaker
+    TIMEOUTS = {
+        "tavily": (3, 25),
+        "news": (3, 8),
+        "weather": (3, 5),
+        "geolocation": (3, 5),
+        "stock": (3, 8),
+        "wikipedia": (3, 6),
+        "gemini": (3, 25)
+    }
+    # A slow Tavily call gets a duplicate raced against it once it has taken longer than the
+    # endpoint's recent p95 latency (never sooner than HEDGE_AFTER seconds), so about one call in
+    # twenty is sent twice. Until HEDGE_MIN_SAMPLES calls have been timed, nothing is hedged.
+    HEDGE_AFTER = 0.8
+    HEDGE_MIN_SAMPLES = 20
+    HEDGE_WINDOW = 200
+
+    # Fixed parts of each upstream request, so the hot path only fills in the per-call values
+    _TAVILY_URL = "https://api.tavily.com/search"
+    _NEWS_URL = "https://newsapi.org/v2/top-headlines"
+    _WEATHER_URL = "http://api.openweathermap.org/data/2.5/weather"
+    _STOCK_URL = "https://www.alphavantage.co/query"
+    _WIKIPEDIA_URL = "https://en.wikipedia.org/w/api.php"
+    _GEOLOCATION_URL = "https://api.ipgeolocation.io/ipgeo"
+    _GEMINI_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash-exp:generateContent"
+    _TAVILY_PAYLOAD = MappingProxyType({
+        "search_depth": "advanced",
+        "include_answer": True,
+        "include_images": False,
+        "include_raw_content": False
+    })
+    # Title and intro extract in one round trip, capped just past the 500 characters we keep
+    _WIKIPEDIA_PARAMS = MappingProxyType({
+        "action": "query",
+        "format": "json",
+        "prop": "extracts",
+        "exintro": 1,
+        "explaintext": 1,
+        "exchars": 520,
+        "redirects": 1
+    })
+    # Wikipedia asks API clients to identify themselves
+    _WIKIPEDIA_HEADERS = MappingProxyType({
+        "User-Agent": "MultiAgentSystem/1.0 (https://github.com/your-username/multi-agent-system)"
+    })
+
+    def __init__(self, cfg: Optional[APIConfig] = None):
+        self.cfg = cfg = cfg or APIConfig.from_env()
+        
+        # Request fragments that depend on the API keys. Tavily, NewsAPI and Gemini take their keys as
+        # headers, which keeps them out of bodies, URLs and access logs
+        self._tavily_headers = MappingProxyType({"Authorization": f"Bearer {cfg.tavily_api_key}"})
+        self._news_headers = MappingProxyType({"X-Api-Key": cfg.news_api_key})
+        self._gemini_headers = MappingProxyType({"x-goog-api-key": cfg.google_api_key})
+        self._news_params = MappingProxyType({"pageSize": 5})
+        self._weather_params = MappingProxyType({"appid": cfg.openweather_api_key, "units": "metric"})
+        self._stock_params = MappingProxyType({"function": "GLOBAL_QUOTE", "apikey": cfg.alpha_vantage_api_key})
+        self._geolocation_url = f"{self._GEOLOCATION_URL}?apiKey={cfg.ip_geolocation_api_key}"
         
-        # Initialize Wikipedia API with proper user agent
-        self.wiki_wiki = wikipediaapi.Wikipedia(
-            user_agent='MultiAgentSystem/1.0 (https://github.com/your-username/multi-agent-system)',
-            language='en'
+        # Resolve the known upstream hosts in the background so first calls skip DNS
+        _warm_dns((self._TAVILY_URL, self._NEWS_URL, self._WEATHER_URL, self._STOCK_URL,
+                   self._WIKIPEDIA_URL, self._GEMINI_URL, self._GEOLOCATION_URL))
+        
+        # Shared keep-alive session so repeat calls to the same host reuse TCP/TLS connections
+        self.session = requests.Session()
+        adapter = _CachedDNSAdapter(
+            pool_connections=16,
+            pool_maxsize=64,
+            max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[429, 500, 502, 503, 504])
         )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Connection"] = "keep-alive"
         
-        # Initialize Langfuse for observability
-        try:
-            from langfuse import Langfuse
-            self.langfuse = Langfuse(
-                public_key=os.getenv("LANGFUSE_PUBLIC_KEY"),
-                secret_key=os.getenv("LANGFUSE_SECRET_KEY"),
-                host=os.getenv("LANGFUSE_HOST", "https://cloud.langfuse.com")
-            )
-        except ImportError:
-            self.langfuse = None
-        except Exception as e:
-            print(f"Warning: Langfuse initialization failed: {e}")
-            self.langfuse = None
-    
-    def tavily_search(self, query):
-        """Search using Tavily API"""
-        if not self.tavily_api_key:
-            return "Tavily API key not configured"
-            
-        # Add Langfuse span for tracing if available
-        span = None
-        if self.langfuse:
+        # Successful responses per endpoint, so repeat lookups skip the network
+        self._caches = {
+            endpoint: _TTLCache(self.CACHE_MAXSIZES.get(endpoint, self.CACHE_MAXSIZE), ttl)
+            for endpoint, ttl in self.CACHE_TTLS.items()
+        }
+        # (etag, last_modified, result) of the last 200 for endpoints that support conditional requests
+        self._validators = {
+            endpoint: _TTLCache(self.CACHE_MAXSIZE, self.CACHE_TTLS[endpoint] * self.REVALIDATE_FOR)
+            for endpoint in self.CONDITIONAL_ENDPOINTS
+        }
+        
+        # Shared response cache across workers, with stale copies kept for upstream outages
+        self.redis = None
+        if cfg.redis_url and redis:
             try:
-                trace = self.langfuse.trace(name="external-api-call", user_id="default_user")
-                span = trace.span(
-                    name="tavily-search",
-                    input={"query": query}
-                )
+                self.redis = redis.Redis.from_url(cfg.redis_url, decode_responses=False)
             except Exception as e:
-                print(f"Warning: Failed to create Langfuse span: {e}")
+                print(f"Warning: Redis initialization failed: {e}")
         
-        url = "https://api.tavily.com/search"
-        payload = {
-            "api_key": self.tavily_api_key,
-            "query": query,
-            "search_depth": "advanced",
-            "include_answer": True,
-            "include_images": False,
-            "include_raw_content": False
-        }
+        # Async client is created lazily, once per event loop
+        self._aclients = _LoopClients(lambda: httpx.AsyncClient(
+            http2=h2 is not None,
+            timeout=30,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64)
+        ))
         
-        try:
-            response = requests.post(url, json=payload, timeout=30)
-            if response.status_code == 200:
-                data = response.json()
-                result = data.get("answer", "No answer found") or data.get("results", [])
-                
-                # Update Langfuse span with output if available
-                if span:
-                    try:
-                        span.update(
-                            output=result,
-                            metadata={"status": "success"}
-                        )
-                    except Exception as e:
-                        print(f"Warning: Failed to update Langfuse span: {e}")
-                
-                return result
-            else:
-                error_msg = f"Tavily API Error: {response.status_code} - {response.text}"
-                
-                # Update Langfuse span with error if available
-                if span:
-                    try:
-                        span.update(
-                            output=error_msg,
-                            metadata={"status": "error", "error_code": response.status_code}
-                        )
-                    except Exception as e:
-                        print(f"Warning: Failed to update Langfuse span: {e}")
-                
-                return error_msg
-        except Exception as e:
-            error_msg = f"Tavily Search Error: {str(e)}"
-            
-            # Update Langfuse span with error if available
-            if span:
-                try:
-                    span.update(
-                        output=error_msg,
-                        metadata={"status": "exception", "error_type": type(e).__name__}
-                    )
-                except Exception as e:
-                    print(f"Warning: Failed to update Langfuse span: {e}")
-            
-            return error_msg
+        # Requests currently being fetched, so concurrent identical calls share one upstream hit
+        self._inflight: Dict[str, tuple] = {}
+        self._ainflight: Dict[tuple, asyncio.Future] = {}
+        self._inflight_lock = threading.Lock()
+        
+        # Circuit breaker per upstream host, so an outage fails fast instead of waiting out timeouts
+        self._breakers: Dict[str, _CircuitBreaker] = {}
+        self._breakers_lock = threading.Lock()
+        
+        # Recent async call latencies per hedged endpoint, for _hedge_delay
+        self._latencies: Dict[str, deque] = {}
+        
+        # Initialize Langfuse for observability
+        self.langfuse = _get_langfuse()
     
-    def get_news(self, category="technology"):
-        """Get news using News API"""
-        if not self.news_api_key:
-            return "News API key not configured"
-            
-        # Add Langfuse span for tracing if available
+    def _send(self, request):
+        """Issue a (method, url, kwargs) request on the shared session"""
+        method, url, kwargs = request
+        return self.session.request(method, url, **kwargs)
+
+    async def _asend(self, request):
+        """Issue a (method, url, kwargs) request on the async client"""
+        method, url, kwargs = request
+        # httpx takes an httpx.Timeout rather than requests' (connect, read) tuple
+        kwargs = dict(kwargs)
+        connect, read = kwargs.pop("timeout")
+        client = await self._aclients.get()
+        return await client.request(method, url, timeout=httpx.Timeout(read, connect=connect), **kwargs)
+
+    @contextmanager
+    def _trace(self, name, span_input):
+        """Open a Langfuse span for an external API call and yield record(output, metadata) for its outcome.
+        Tracing failures are reported and never reach the caller."""
         span = None
         if self.langfuse:
             try:
                 trace = self.langfuse.trace(name="external-api-call", user_id="default_user")
-                span = trace.span(
-                    name="news-api-call",
-                    input={"category": category}
-                )
+                span = trace.span(name=name, input=span_input)
             except Exception as e:
                 print(f"Warning: Failed to create Langfuse span: {e}")
-        
-        url = "https://newsapi.org/v2/top-headlines"
-        params = {
-            "category": category,
-            "apiKey": self.news_api_key,
-            "pageSize": 5
-        }
-        
-        try:
-            response = requests.get(url, params=params, timeout=30)
-            if response.status_code == 200:
-                data = response.json()
-                articles = data.get("articles", [])
-                result = [{"title": a["title"], "description": a["description"]} for a in articles]
-                
-                # Update Langfuse span with output if available
-                if span:
-                    try:
-                        span.update(
-                            output=result,
-                            metadata={"status": "success", "article_count": len(articles)}
-                        )
-                    except Exception as e:
-                        print(f"Warning: Failed to update Langfuse span: {e}")
-                
-                return result
-            else:
-                error_msg = f"News API Error: {response.status_code} - {response.text}"
-                
-                # Update Langfuse span with error if available
-                if span:
-                    try:
-                        span.update(
-                            output=error_msg,
-                            metadata={"status": "error", "error_code": response.status_code}
-                        )
-                    except Exception as e:
-                        print(f"Warning: Failed to update Langfuse span: {e}")
-                
-                return error_msg
-        except Exception as e:
-            error_msg = f"News API Error: {str(e)}"
-            
-            # Update Langfuse span with error if available
+
+        def record(output, metadata):
             if span:
                 try:
-                    span.update(
-                        output=error_msg,
-                        metadata={"status": "exception", "error_type": type(e).__name__}
-                    )
+                    span.update(output=output, metadata=metadata)
                 except Exception as e:
                     print(f"Warning: Failed to update Langfuse span: {e}")
-            
-            return error_msg
-    
-    def get_weather(self, city):
-        """Get weather using OpenWeather API"""
-        if not self.openweather_api_key:
-            return "OpenWeather API key not configured"
-            
-        url = "http://api.openweathermap.org/data/2.5/weather"
-        params = {
-            "q": city,
-            "appid": self.openweather_api_key,
-            "units": "metric"
-        }
-        
+
+        yield record
+
+    @staticmethod
+    def _finish(response, parse, record, success_metadata=None):
+        """Parse a response and record it on the span"""
+        result = parse(response)
+        if response.status_code == 200:
+            metadata = {"status": "success"}
+            if success_metadata:
+                metadata.update(success_metadata(result))
+        else:
+            metadata = {"status": "error", "error_code": response.status_code}
+        record(result, metadata)
+        return result
+
+    @staticmethod
+    def _fail(error_label, e, record):
+        """Turn a request exception into an error string and record it on the span"""
+        error_msg = f"{error_label}: {str(e)}"
+        record(error_msg, {"status": "exception", "error_type": type(e).__name__})
+        return error_msg
+
+    @staticmethod
+    def _redis_key(endpoint, cache_key):
+        digest = hashlib.sha1(repr(cache_key).encode()).hexdigest()
+        return f"ext:{endpoint}:{digest}"
+
+    def _cache_lookup(self, endpoint, cache_key):
+        """Return a fresh cached response from the local or Redis cache, or _MISS"""
+        cache = self._caches.get(endpoint)
+        if cache is None:
+            return _MISS
+        cached = cache.get(cache_key)
+        if cached is not _MISS or not self.redis:
+            return cached
         try:
-            response = requests.get(url, params=params, timeout=30)
-            if response.status_code == 200:
-                data = response.json()
-                return {
-                    "city": city,
-                    "temperature": data["main"]["temp"],
-                    "description": data["weather"][0]["description"],
-                    "humidity": data["main"]["humidity"]
-                }
-            else:
-                return f"Weather API Error: {response.status_code} - {response.text}"
+            entry = self.redis.hgetall(self._redis_key(endpoint, cache_key))
         except Exception as e:
-            return f"Weather API Error: {str(e)}"
-    
-    def get_geolocation(self, ip_address=""):
-        """Get geolocation using IP Geolocation API"""
-        if not self.ip_geolocation_api_key:
-            return "IP Geolocation API key not configured"
-            
-        if ip_address:
-            url = f"https://api.ipgeolocation.io/ipgeo?apiKey={self.ip_geolocation_api_key}&ip={ip_address}"
-        else:
-            url = f"https://api.ipgeolocation.io/ipgeo?apiKey={self.ip_geolocation_api_key}"
-        
+            print(f"Warning: Redis lookup failed: {e}")
+            return _MISS
+        if entry and float(entry[b"stale_at"]) > time.time():
+            result = _loads(entry[b"body"])
+            cache.set(cache_key, result)
+            return result
+        return _MISS
+
+    def _cache_store(self, endpoint, cache_key, result, generation_time):
+        """Store a successful response locally and in Redis"""
+        cache = self._caches.get(endpoint)
+        if cache is None:
+            return
+        cache.set(cache_key, result)
+        if not self.redis:
+            return
+        now = time.time()
+        # Keep the entry past its TTL so it can be served stale; slower upstreams get a longer grace period
+        grace = max(cache.ttl, generation_time * 10)
+        key = self._redis_key(endpoint, cache_key)
         try:
-            response = requests.get(url, timeout=30)
-            if response.status_code == 200:
-                data = response.json()
-                return {
-                    "country": data.get("country_name", ""),
-                    "state": data.get("state_prov", ""),
-                    "city": data.get("city", ""),
-                    "latitude": data.get("latitude", ""),
-                    "longitude": data.get("longitude", "")
-                }
-            else:
-                return f"Geolocation API Error: {response.status_code} - {response.text}"
+            pipe = self.redis.pipeline()
+            pipe.hset(key, mapping={
+                "body": _dumps(result),
+                "generated_at": now,
+                "stale_at": now + cache.ttl,
+                "status": 200
+            })
+            pipe.expire(key, int(cache.ttl + grace))
+            pipe.execute()
         except Exception as e:
-            return f"Geolocation API Error: {str(e)}"
-    
-    def get_stock_data(self, symbol):
-        """Get stock data using Alpha Vantage API"""
-        if not self.alpha_vantage_api_key:
-            return "Alpha Vantage API key not configured"
-            
-        url = "https://www.alphavantage.co/query"
-        params = {
-            "function": "GLOBAL_QUOTE",
-            "symbol": symbol,
-            "apikey": self.alpha_vantage_api_key
-        }
-        
+            print(f"Warning: Redis store failed: {e}")
+
+    @staticmethod
+    def _ok(data, status=200, cached=False, stale=False) -> APIResult:
+        return {"ok": not stale, "data": data, "error": None, "status": status, "cached": cached, "stale": stale}
+
+    @staticmethod
+    def _err(error, status=None) -> APIResult:
+        return {"ok": False, "data": None, "error": error, "status": status, "cached": False, "stale": False}
+
+    def _stale_fallback(self, endpoint, cache_key, error_result: APIResult) -> APIResult:
+        """On upstream failure, serve the last good response from Redis if one is kept"""
+        if not self.redis or endpoint not in self._caches:
+            return error_result
         try:
-            response = requests.get(url, params=params, timeout=30)
-            if response.status_code == 200:
-                data = response.json()
-                quote = data.get("Global Quote", {})
-                if quote:
-                    return {
-                        "symbol": quote.get("01. symbol", ""),
-                        "price": quote.get("05. price", ""),
-                        "change": quote.get("09. change", ""),
-                        "change_percent": quote.get("10. change percent", "")
-                    }
-                else:
-                    return "No stock data found"
-            else:
-                return f"Alpha Vantage API Error: {response.status_code} - {response.text}"
+            body = self.redis.hget(self._redis_key(endpoint, cache_key), "body")
         except Exception as e:
-            return f"Alpha Vantage API Error: {str(e)}"
-    
-    def search_wikipedia(self, query):
-        """Search Wikipedia"""
+            print(f"Warning: Redis lookup failed: {e}")
+            return error_result
+        if body is None:
+            return error_result
+        result = self._ok(_loads(body), status=error_result["status"], cached=True, stale=True)
+        result["error"] = error_result["error"]
+        return result
+
+    def _single_flight(self, endpoint, cache_key, fetch):
+        """Run fetch() once per key at a time; concurrent callers with the same key wait for its result"""
+        if endpoint not in self._caches:
+            return fetch()
+        key = self._redis_key(endpoint, cache_key)
+        with self._inflight_lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = (threading.Event(), [])
+        done, box = flight
+        if not leader:
+            done.wait()
+            result, error = box
+            if error is not None:
+                raise error
+            return result
+        try:
+            result = fetch()
+            box[:] = [result, None]
+            return result
+        except Exception as e:
+            box[:] = [None, e]
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+            done.set()
+
+    async def _asingle_flight(self, endpoint, cache_key, fetch):
+        """Async counterpart of _single_flight; followers await the leader's future"""
+        if endpoint not in self._caches:
+            return await fetch()
+        # Futures belong to one event loop, so flights are tracked per loop
+        key = (asyncio.get_running_loop(), self._redis_key(endpoint, cache_key))
+        flight = self._ainflight.get(key)
+        if flight is not None:
+            return await asyncio.shield(flight)
+        flight = self._ainflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await fetch()
+            flight.set_result(result)
+            return result
+        except BaseException as e:
+            flight.set_exception(e)
+            # Mark the exception retrieved in case no follower awaited this flight
+            flight.exception()
+            raise
+        finally:
+            self._ainflight.pop(key, None)
+
+    def _call(self, endpoint, cache_key, request, parse, error_label, trace, success_metadata=None):
+        """Run a request synchronously and parse its response, serving repeats from the cache"""
+        return self._single_flight(
+            endpoint, cache_key,
+            lambda: self._fetch(endpoint, cache_key, request, parse, error_label, trace, success_metadata)
+        )
+
+    def _conditional(self, endpoint, cache_key, request):
+        """Add If-None-Match/If-Modified-Since from the last good response; return (request, its result or _MISS)"""
+        validators = self._validators.get(endpoint)
+        entry = validators.get(cache_key) if validators else _MISS
+        if entry is _MISS:
+            return request, _MISS
+        etag, last_modified, previous = entry
+        method, url, kwargs = request
+        headers = dict(kwargs.get("headers", {}))
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return (method, url, {**kwargs, "headers": headers}), previous
+
+    def _complete(self, endpoint, cache_key, response, parse, record, success_metadata, started, previous):
+        """Parse a response, or reuse the previous result on 304, and update the caches"""
+        if response.status_code == 304 and previous is not _MISS:
+            record(previous, {"status": "not_modified"})
+            self._cache_store(endpoint, cache_key, previous, time.monotonic() - started)
+            return self._ok(previous, status=304, cached=True)
+        result = self._finish(response, parse, record, success_metadata)
+        # Only successful responses are cached; errors are retried on the next call
+        if response.status_code != 200:
+            return self._stale_fallback(endpoint, cache_key, self._err(result, response.status_code))
+        validators = self._validators.get(endpoint)
+        if validators:
+            etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+            if etag or last_modified:
+                validators.set(cache_key, (etag, last_modified, result))
+        self._cache_store(endpoint, cache_key, result, time.monotonic() - started)
+        return self._ok(result)
+
+    def _breaker(self, request):
+        host = urlsplit(request[1]).hostname
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            with self._breakers_lock:
+                breaker = self._breakers.setdefault(host, _CircuitBreaker())
+        return breaker, host
+
+    def _report_circuit(self, host, state):
+        """Log a circuit breaker transition and record it in Langfuse"""
+        print(f"Warning: circuit for {host} is now {state}")
+        if self.langfuse:
+            try:
+                self.langfuse.trace(name="circuit-breaker", metadata={"host": host, "state": state})
+            except Exception as e:
+                print(f"Warning: Failed to record circuit breaker transition: {e}")
+
+    def _observe(self, breaker, host, ok):
+        """Feed a call outcome to the host's breaker; rate limits and 5xx count as failures"""
+        if ok:
+            if breaker.success():
+                self._report_circuit(host, "closed")
+        elif breaker.failure():
+            self._report_circuit(host, "open")
+
+    def _circuit_open(self, endpoint, cache_key, error_label, host, record):
+        error_msg = f"{error_label}: circuit open, {host} is failing"
+        record(error_msg, {"status": "circuit_open"})
+        return self._stale_fallback(endpoint, cache_key, self._err(error_msg))
+
+    def _fetch(self, endpoint, cache_key, request, parse, error_label, trace, success_metadata=None):
+        cached = self._cache_lookup(endpoint, cache_key)
+        if cached is not _MISS:
+            return self._ok(cached, cached=True)
+        request, previous = self._conditional(endpoint, cache_key, request)
+        breaker, host = self._breaker(request)
+        with self._trace(*trace) as record:
+            if not breaker.allow():
+                return self._circuit_open(endpoint, cache_key, error_label, host, record)
+            started = time.monotonic()
+            response = None
+            try:
+                response = self._send(request)
+                self._observe(breaker, host, response.status_code < 500 and response.status_code != 429)
+                return self._complete(endpoint, cache_key, response, parse, record, success_metadata, started, previous)
+            except Exception as e:
+                if response is None:
+                    self._observe(breaker, host, False)
+                return self._stale_fallback(endpoint, cache_key, self._err(self._fail(error_label, e, record)))
+
+    def _hedge_delay(self, endpoint):
+        """Seconds to wait before hedging a call to endpoint, or None while too few calls are timed"""
+        samples = self._latencies.get(endpoint)
+        if not samples or len(samples) < self.HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        return max(self.HEDGE_AFTER, ordered[int(len(ordered) * 0.95)])
+
+    def _record_latency(self, endpoint, seconds):
+        samples = self._latencies.get(endpoint)
+        if samples is None:
+            samples = self._latencies.setdefault(endpoint, deque(maxlen=self.HEDGE_WINDOW))
+        samples.append(seconds)
+
+    async def _hedged(self, make_request, hedge_after, max_hedges=1):
+        """Start make_request(), and if it hasn't finished after hedge_after seconds race up to
+        max_hedges duplicates against it; return the first success and cancel the rest"""
+        pending = {asyncio.ensure_future(make_request())}
+        hedges_left = max_hedges
         try:
-            page = self.wiki_wiki.page(query)
-            if page.exists():
+            while True:
+                done, pending = await asyncio.wait(
+                    pending, timeout=hedge_after if hedges_left else None, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    # A failure is the caller's to handle; only slowness is hedged
+                    if not pending:
+                        raise task.exception()
+                if hedges_left and not done:
+                    pending.add(asyncio.ensure_future(make_request()))
+                    hedges_left -= 1
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _acall(self, endpoint, cache_key, request, parse, error_label, trace, success_metadata=None,
+                     hedge=False):
+        """Run a request on the event loop and parse its response, serving repeats from the cache"""
+        if httpx is None:
+            return await asyncio.to_thread(
+                self._call, endpoint, cache_key, request, parse, error_label, trace, success_metadata
+            )
+        return await self._asingle_flight(
+            endpoint, cache_key,
+            lambda: self._afetch(endpoint, cache_key, request, parse, error_label, trace, success_metadata, hedge)
+        )
+
+    async def _afetch(self, endpoint, cache_key, request, parse, error_label, trace, success_metadata=None,
+                      hedge=False):
+        cached = self._cache_lookup(endpoint, cache_key)
+        if cached is not _MISS:
+            return self._ok(cached, cached=True)
+        request, previous = self._conditional(endpoint, cache_key, request)
+        breaker, host = self._breaker(request)
+        with self._trace(*trace) as record:
+            if not breaker.allow():
+                return self._circuit_open(endpoint, cache_key, error_label, host, record)
+            started = time.monotonic()
+            response = None
+            try:
+                hedge_after = self._hedge_delay(endpoint) if hedge else None
+                if hedge_after is None:
+                    response = await self._asend(request)
+                else:
+                    response = await self._hedged(lambda: self._asend(request), hedge_after)
+                if hedge:
+                    self._record_latency(endpoint, time.monotonic() - started)
+                self._observe(breaker, host, response.status_code < 500 and response.status_code != 429)
+                return self._complete(endpoint, cache_key, response, parse, record, success_metadata, started, previous)
+            except Exception as e:
+                if response is None:
+                    self._observe(breaker, host, False)
+                return self._stale_fallback(endpoint, cache_key, self._err(self._fail(error_label, e, record)))
+
+    # Request builders and response parsers, shared by the sync and async methods
+
+    def _tavily_request(self, query):
+        payload = {"query": query, **self._TAVILY_PAYLOAD}
+        return "POST", self._TAVILY_URL, {
+            "json": payload, "headers": dict(self._tavily_headers), "timeout": self.TIMEOUTS["tavily"]
+        }
+
+    @staticmethod
+    def _parse_tavily(response):
+        if response.status_code == 200:
+            data = _json(response)
+            return data.get("answer", "No answer found") or data.get("results", [])
+        return f"Tavily API Error: {response.status_code} - {response.text}"
+
+    def _news_request(self, category):
+        params = {"category": category, **self._news_params}
+        return "GET", self._NEWS_URL, {
+            "params": params, "headers": dict(self._news_headers), "timeout": self.TIMEOUTS["news"]
+        }
+
+    @staticmethod
+    def _parse_news(response):
+        if response.status_code == 200:
+            data = _json(response)
+            articles = data.get("articles", [])
+            return [{"title": a["title"], "description": a["description"]} for a in articles]
+        return f"News API Error: {response.status_code} - {response.text}"
+
+    def _weather_request(self, city):
+        return "GET", self._WEATHER_URL, {
+            "params": {"q": city, **self._weather_params}, "timeout": self.TIMEOUTS["weather"]
+        }
+
+    @staticmethod
+    def _parse_weather(response, city):
+        if response.status_code == 200:
+            data = _json(response)
+            return {
+                "city": city,
+                "temperature": data["main"]["temp"],
+                "description": data["weather"][0]["description"],
+                "humidity": data["main"]["humidity"]
+            }
+        return f"Weather API Error: {response.status_code} - {response.text}"
+
+    def _geolocation_request(self, ip_address):
+        url = f"{self._geolocation_url}&ip={ip_address}" if ip_address else self._geolocation_url
+        return "GET", url, {"timeout": self.TIMEOUTS["geolocation"]}
+
+    @staticmethod
+    def _parse_geolocation(response):
+        if response.status_code == 200:
+            data = _json(response)
+            return {
+                "country": data.get("country_name", ""),
+                "state": data.get("state_prov", ""),
+                "city": data.get("city", ""),
+                "latitude": data.get("latitude", ""),
+                "longitude": data.get("longitude", "")
+            }
+        return f"Geolocation API Error: {response.status_code} - {response.text}"
+
+    def _stock_request(self, symbol):
+        return "GET", self._STOCK_URL, {
+            "params": {"symbol": symbol, **self._stock_params}, "timeout": self.TIMEOUTS["stock"]
+        }
+
+    @staticmethod
+    def _parse_stock(response):
+        if response.status_code == 200:
+            data = _json(response)
+            quote = data.get("Global Quote", {})
+            if quote:
                 return {
-                    "title": page.title,
-                    "summary": page.summary[:500] + "..." if len(page.summary) > 500 else page.summary
+                    "symbol": quote.get("01. symbol", ""),
+                    "price": quote.get("05. price", ""),
+                    "change": quote.get("09. change", ""),
+                    "change_percent": quote.get("10. change percent", "")
                 }
-            else:
+            return "No stock data found"
+        return f"Alpha Vantage API Error: {response.status_code} - {response.text}"
+
+    @classmethod
+    def _wikipedia_request(cls, query):
+        params = {**cls._WIKIPEDIA_PARAMS, "titles": query}
+        return "GET", cls._WIKIPEDIA_URL, {
+            "params": params, "headers": dict(cls._WIKIPEDIA_HEADERS), "timeout": cls.TIMEOUTS["wikipedia"]
+        }
+
+    @staticmethod
+    def _parse_wikipedia(response):
+        if response.status_code == 200:
+            pages = _json(response).get("query", {}).get("pages", {})
+            page = next(iter(pages.values()), None)
+            if page is None or "missing" in page or "invalid" in page:
                 return "No Wikipedia page found for this query"
-        except Exception as e:
-            return f"Wikipedia Search Error: {str(e)}"
-    
-    def gemini_fallback(self, prompt):
-        """Fallback to Gemini 2.0 Flash if OpenRouter fails"""
-        if not self.google_api_key:
-            return "Google API key not configured"
-            
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash-exp:generateContent?key={self.google_api_key}"
-        
+            summary = page.get("extract", "")
+            return {
+                "title": page["title"],
+                "summary": summary[:500] + "..." if len(summary) > 500 else summary
+            }
+        return f"Wikipedia Search Error: {response.status_code} - {response.text}"
+
+    def _gemini_request(self, prompt):
         payload = {
             "contents": [{
                 "parts": [{
@@ -292,13 +882,158 @@ class ExternalAPIs:
                 }]
             }]
         }
-        
-        try:
-            response = requests.post(url, json=payload, timeout=30)
-            if response.status_code == 200:
-                data = response.json()
-                return data["candidates"][0]["content"]["parts"][0]["text"]
-            else:
-                return f"Gemini API Error: {response.status_code} - {response.text}"
-        except Exception as e:
-            return f"Gemini Fallback Error: {str(e)}"
\ No newline at end of file
+        return "POST", self._GEMINI_URL, {
+            "json": payload, "headers": dict(self._gemini_headers), "timeout": self.TIMEOUTS["gemini"]
+        }
+
+    @staticmethod
+    def _gemini_cache_key(prompt):
+        """(endpoint, cache_key) for a prompt: cached by its hash, or uncached when it asks for fresh data"""
+        if _FRESHNESS_RE.search(prompt):
+            return None, None
+        return "gemini", (hashlib.sha1(prompt.encode()).hexdigest(),)
+
+    @staticmethod
+    def _parse_gemini(response):
+        if response.status_code == 200:
+            data = _json(response)
+            return data["candidates"][0]["content"]["parts"][0]["text"]
+        return f"Gemini API Error: {response.status_code} - {response.text}"
+
+    # Synchronous API methods
+
+    def tavily_search(self, query) -> APIResult:
+        """Search using Tavily API"""
+        if not self.cfg.tavily_api_key:
+            return self._err("Tavily API key not configured")
+        return self._call(
+            "tavily", (query,), self._tavily_request(query), self._parse_tavily, "Tavily Search Error",
+            trace=("tavily-search", {"query": query})
+        )
+    
+    def get_news(self, category="technology") -> APIResult:
+        """Get news using News API"""
+        if not self.cfg.news_api_key:
+            return self._err("News API key not configured")
+        return self._call(
+            "news", (category,), self._news_request(category), self._parse_news, "News API Error",
+            trace=("news-api-call", {"category": category}),
+            success_metadata=lambda result: {"article_count": len(result)}
+        )
+    
+    def get_weather(self, city) -> APIResult:
+        """Get weather using OpenWeather API"""
+        if not self.cfg.openweather_api_key:
+            return self._err("OpenWeather API key not configured")
+        return self._call(
+            "weather", (city,), self._weather_request(city), lambda r: self._parse_weather(r, city), "Weather API Error",
+            trace=("weather-api-call", {"city": city})
+        )
+    
+    def get_geolocation(self, ip_address="") -> APIResult:
+        """Get geolocation using IP Geolocation API"""
+        if not self.cfg.ip_geolocation_api_key:
+            return self._err("IP Geolocation API key not configured")
+        return self._call(
+            "geolocation", (ip_address,), self._geolocation_request(ip_address), self._parse_geolocation,
+            "Geolocation API Error", trace=("geolocation-api-call", {"ip_address": ip_address})
+        )
+    
+    def get_stock_data(self, symbol) -> APIResult:
+        """Get stock data using Alpha Vantage API"""
+        if not self.cfg.alpha_vantage_api_key:
+            return self._err("Alpha Vantage API key not configured")
+        return self._call(
+            "stock", (symbol,), self._stock_request(symbol), self._parse_stock, "Alpha Vantage API Error",
+            trace=("stock-api-call", {"symbol": symbol})
+        )
+    
+    def search_wikipedia(self, query) -> APIResult:
+        """Search Wikipedia"""
+        return self._call(
+            "wikipedia", (query,), self._wikipedia_request(query), self._parse_wikipedia, "Wikipedia Search Error",
+            trace=("wikipedia-search", {"query": query})
+        )
+    
+    def gemini_fallback(self, prompt) -> APIResult:
+        """Fallback to Gemini 2.0 Flash if OpenRouter fails"""
+        if not self.cfg.google_api_key:
+            return self._err("Google API key not configured")
+        return self._call(
+            *self._gemini_cache_key(prompt), self._gemini_request(prompt), self._parse_gemini,
+            "Gemini Fallback Error",
+            trace=("gemini-fallback", {"prompt": prompt})
+        )
+
+    # Async API methods, for fanning out several calls with asyncio.gather
+
+    async def a_tavily_search(self, query) -> APIResult:
+        """Async variant of tavily_search"""
+        if not self.cfg.tavily_api_key:
+            return self._err("Tavily API key not configured")
+        return await self._acall(
+            "tavily", (query,), self._tavily_request(query), self._parse_tavily, "Tavily Search Error",
+            trace=("tavily-search", {"query": query}), hedge=True
+        )
+
+    async def a_get_news(self, category="technology") -> APIResult:
+        """Async variant of get_news"""
+        if not self.cfg.news_api_key:
+            return self._err("News API key not configured")
+        return await self._acall(
+            "news", (category,), self._news_request(category), self._parse_news, "News API Error",
+            trace=("news-api-call", {"category": category}),
+            success_metadata=lambda result: {"article_count": len(result)}
+        )
+
+    async def a_get_weather(self, city) -> APIResult:
+        """Async variant of get_weather"""
+        if not self.cfg.openweather_api_key:
+            return self._err("OpenWeather API key not configured")
+        return await self._acall(
+            "weather", (city,), self._weather_request(city), lambda r: self._parse_weather(r, city), "Weather API Error",
+            trace=("weather-api-call", {"city": city})
+        )
+
+    async def a_get_geolocation(self, ip_address="") -> APIResult:
+        """Async variant of get_geolocation"""
+        if not self.cfg.ip_geolocation_api_key:
+            return self._err("IP Geolocation API key not configured")
+        return await self._acall(
+            "geolocation", (ip_address,), self._geolocation_request(ip_address), self._parse_geolocation,
+            "Geolocation API Error", trace=("geolocation-api-call", {"ip_address": ip_address})
+        )
+
+    async def a_get_stock_data(self, symbol) -> APIResult:
+        """Async variant of get_stock_data"""
+        if not self.cfg.alpha_vantage_api_key:
+            return self._err("Alpha Vantage API key not configured")
+        return await self._acall(
+            "stock", (symbol,), self._stock_request(symbol), self._parse_stock, "Alpha Vantage API Error",
+            trace=("stock-api-call", {"symbol": symbol})
+        )
+
+    async def a_search_wikipedia(self, query) -> APIResult:
+        """Async variant of search_wikipedia"""
+        return await self._acall(
+            "wikipedia", (query,), self._wikipedia_request(query), self._parse_wikipedia, "Wikipedia Search Error",
+            trace=("wikipedia-search", {"query": query})
+        )
+
+    async def a_gemini_fallback(self, prompt) -> APIResult:
+        """Async variant of gemini_fallback"""
+        if not self.cfg.google_api_key:
+            return self._err("Google API key not configured")
+        return await self._acall(
+            *self._gemini_cache_key(prompt), self._gemini_request(prompt), self._parse_gemini,
+            "Gemini Fallback Error",
+            trace=("gemini-fallback", {"prompt": prompt})
+        )
+
+    async def gather_all(self, **calls) -> Dict[str, Any]:
+        """
+        Await several API coroutines concurrently, e.g. gather_all(news=apis.a_get_news(), weather=apis.a_get_weather("London")).
+        Returns a dict keyed like the arguments; a call that raised maps to its exception.
+        """
+        results = await asyncio.gather(*calls.values(), return_exceptions=True)
+        return dict(zip(calls.keys(), results))
@@ -1,18 +1,247 @@
 import os
-import json
+import time
+import atexit
+import asyncio
+import threading
+import contextvars
+import uuid
+import hashlib
+import functools
+import string
+import re
 import requests
+from requests.adapters import HTTPAdapter
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from typing import Dict, Any, List
-from agents.external_apis import ExternalAPIs
+from typing import Dict, Any, List, AsyncIterator, Tuple, Union
+from agents.external_apis import ExternalAPIs, _TTLCache, _CircuitBreaker, _LoopClients, _MISS, _loads, _dumps, _json
+from agents._memory_writer import MEMORY_WRITER as _MEMORY_WRITER
+from agents._shared import get_langfuse as _get_langfuse, get_mem0_client as _get_mem0_client
 
-# Load environment variables
-load_dotenv()
+# httpx is optional; without it the async methods run the sync calls in worker threads
+try:
+    import httpx
+except ImportError:
+    httpx = None
 
-# Try to import Mem0 memory client
+# h2 is optional; with it concurrent OpenRouter calls share one HTTP/2 connection
 try:
-    from mem0 import MemoryClient
+    import h2
 except ImportError:
-    MemoryClient = None
+    h2 = None
+
+# Load environment variables
+load_dotenv()
+
+OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+MODEL = "meta-llama/llama-4-maverick:free"
+
+# Only the most recent interactions go into the prompt, each capped in length
+CONTEXT_HISTORY_SIZE = 5
+MAX_CONTEXT_ENTRY_CHARS = 500
+
+# Responses are capped at this length before going into the context history or Mem0
+MAX_STORED_RESPONSE_CHARS = 512
+
+def _truncate(text: str, limit: int = MAX_STORED_RESPONSE_CHARS) -> str:
+    return text if len(text) <= limit else text[:limit] + "…"
+
+# Shared keep-alive session so repeat OpenRouter calls (and the moderation retry) reuse TCP/TLS connections
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=64))
+_SESSION.headers["Connection"] = "keep-alive"
+
+# Stop calling OpenRouter for a while once it keeps refusing (403) or rate limiting (429) us,
+# or keeps failing at the network level, instead of doubling the load with moderation retries
+_OPENROUTER_BREAKER = _CircuitBreaker(fail_max=5, reset_timeout=30)
+
+# Queries likely to trip OpenRouter's content moderation with the full prompt; these go straight
+# to the concise prompt instead of paying for a 403 and a retry. The concise prompt drops the
+# caller's context and the conversation history, so only terms that reliably get blocked belong
+# here (not everyday ones like "drug discovery" or "kill switch"); anything else that trips
+# moderation still falls back to the concise prompt after its 403.
+_MODERATION_PATTERNS = re.compile(
+    r"\b(weapons?|explosives?|suicide|self[- ]harm|terroris[mt])\b",
+    re.IGNORECASE
+)
+
+# Timed-out calls are retried with exponential backoff (1s, 2s, ... capped at 10s)
+RETRY_ATTEMPTS = 3
+MAX_RETRY_BACKOFF = 10
+
+def _is_moderation_block(response):
+    """Whether a (read) response is a 403 from content moderation, which is about the query rather
+    than about OpenRouter"""
+    if response.status_code != 403:
+        return False
+    try:
+        error_response = _json(response)
+    except ValueError:
+        return False
+    return "moderation" in error_response.get("error", {}).get("message", "").lower()
+
+def _record_openrouter_response(response):
+    # Refusals, rate limits and server errors count against OpenRouter; only 2xx counts for it.
+    # Moderation blocks and other client errors are specific to one request and count for neither.
+    status_code = response.status_code
+    if status_code >= 500 or (status_code in (403, 429) and not _is_moderation_block(response)):
+        _OPENROUTER_BREAKER.failure()
+    elif 200 <= status_code < 300:
+        _OPENROUTER_BREAKER.success()
+    else:
+        _OPENROUTER_BREAKER.release()
+
+# Langfuse calls run here so tracing never blocks a response. A single worker keeps each
+# trace's create/generation/update calls in submission order.
+_LANGFUSE_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="adk-langfuse")
+atexit.register(_LANGFUSE_EXECUTOR.shutdown, wait=True)
+
+def _create_generation(trace_future, **kwargs):
+    """Create a Langfuse generation once its trace has been created"""
+    trace = trace_future.result()
+    if not trace:
+        return None
+    try:
+        return trace.generation(id=uuid.uuid4().hex, **kwargs)
+    except Exception as e:
+        print(f"Warning: Failed to create Langfuse generation: {e}")
+        return None
+
+def _update_generation(generation_future, **kwargs):
+    """Update a Langfuse generation once its creation has finished"""
+    generation = generation_future.result()
+    if generation:
+        try:
+            generation.update(**kwargs)
+        except Exception as e:
+            print(f"Warning: Failed to update Langfuse generation: {e}")
+
+# Successful responses, keyed by agent, query and context, so repeated questions skip the LLM call
+_RESPONSE_CACHE = _TTLCache(maxsize=1024, ttl=3600)
+
+# Mem0 is offered to the model as a tool instead of being searched up front for every query
+_MEMORY_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "search_memory",
+        "description": "Search memories of previous interactions with this user",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "query": {"type": "string", "description": "What to look for in the user's memories"}
+            },
+            "required": ["query"]
+        }
+    }
+}
+
+# User whose memories the ADK memory tool searches, set for the duration of a query
+_CURRENT_USER = contextvars.ContextVar("adk_current_user", default="default_user")
+
+def _format_memories(memory_results) -> str:
+    """Render Mem0 search results for the model"""
+    if isinstance(memory_results, list) and len(memory_results) > 0:
+        # Order the top hits by id so the same memories always serialize to the same bytes
+        top = sorted(memory_results[:3], key=lambda m: str(m.get("id", "")) if isinstance(m, dict) else str(m))
+        return f"Relevant memories: {top}"
+    return "No relevant memories from previous interactions"
+
+# Per-query prompt messages, parsed once at import
+_SUMMARY_HISTORY = string.Template("<history>SUMMARY: $summary\nRECENT: $recent</history>")
+_RECENT_HISTORY = string.Template("<history>Previous conversation history: $recent</history>")
+_NO_HISTORY = "<history>No previous conversation history</history>"
+
+# A query's context is either text or labelled sections, e.g. {"research": ..., "analysis": ...};
+# sections are joined straight into the query message, without building the context on its own
+Context = Union[str, Dict[str, Any]]
+_CONTEXT_LABELS = {"research": "Research findings", "analysis": "Analysis results"}
+
+def _context_parts(context: Context) -> Tuple[str, ...]:
+    if not isinstance(context, dict):
+        return (context,)
+    parts = []
+    for key, value in context.items():
+        parts += (_CONTEXT_LABELS.get(key, key.title()), ": ", str(value), "\n\n")
+    return tuple(parts[:-1])
+
+def _query_message(context: Context, query: str) -> str:
+    return "".join((*_context_parts(context), "\n\nQuery: ", query))
+
+# Folds evicted context entries into each agent's running summary, off the response path
+_SUMMARY_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="adk-summary")
+
+class RollingContext:
+    """The most recent interactions, plus a running summary of the ones that have been evicted
+
+    Evicted entries are handed to summarize(summary, entries) in the background; a context
+    only has one fold in flight at a time, so entries are folded in order.
+    """
+
+    def __init__(self, maxlen=CONTEXT_HISTORY_SIZE, summarize=None):
+        self.summary = ""
+        self.recent = deque(maxlen=maxlen)
+        self._summarize = summarize
+        self._evicted = []
+        self._folding = False
+        self._lock = threading.Lock()
+        # Rendered <history> message, rebuilt only after the context changes
+        self._rendered = None
+
+    def append(self, entry: str):
+        schedule = False
+        with self._lock:
+            if self._summarize and len(self.recent) == self.recent.maxlen:
+                self._evicted.append(self.recent[0])
+                schedule = not self._folding
+                self._folding = True
+            self.recent.append(entry)
+            self._rendered = None
+        if schedule:
+            _SUMMARY_EXECUTOR.submit(self._fold)
+
+    def _fold(self):
+        while True:
+            with self._lock:
+                if not self._evicted:
+                    self._folding = False
+                    return
+                evicted, self._evicted = self._evicted, []
+                summary = self.summary
+            try:
+                summary = self._summarize(summary, evicted)
+            except Exception as e:
+                print(f"Warning: Failed to summarize context: {e}")
+                summary = None
+            if summary:
+                with self._lock:
+                    self.summary = summary
+                    self._rendered = None
+
+    def render(self) -> str:
+        """The <history> message for the prompt"""
+        with self._lock:
+            if self._rendered is None:
+                if self.summary:
+                    self._rendered = _SUMMARY_HISTORY.substitute(summary=self.summary, recent="; ".join(self.recent))
+                elif self.recent:
+                    self._rendered = _RECENT_HISTORY.substitute(recent="; ".join(self.recent))
+                else:
+                    self._rendered = _NO_HISTORY
+            return self._rendered
+
+    def __iter__(self):
+        return iter(self.recent)
+
+    def __len__(self):
+        return len(self.recent)
+
+# Shared async clients for OpenRouter, created lazily once per event loop
+_ASYNC_CLIENTS = _LoopClients(lambda: httpx.AsyncClient(
+    timeout=30,
+    http2=h2 is not None,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+))
 
 # Try to import Google ADK components
 try:
@@ -24,72 +253,160 @@ except ImportError:
     InMemoryRunner = None
     GOOGLE_ADK_AVAILABLE = False
 
+# Fallback system prompt. It only depends on the agent's name and expertise, so it is byte-identical
+# across calls and can be served from the provider's prompt cache; per-query context goes in a later message.
+_SYSTEM_PROMPT = """You are {name}, a world-class expert in {expertise}.
+
+YOUR ROLE AND RESPONSIBILITIES:
+- Provide authoritative, accurate, and insightful responses based on your specialized expertise
+- Synthesize complex information into clear, actionable recommendations
+- Draw upon your contextual knowledge and previous interactions to enhance responses
+- Maintain a professional yet accessible communication style
+
+EXPERTISE DOMAIN:
+Your specialized knowledge encompasses:
+- Deep understanding of {expertise}
+- Current trends and developments in your field
+- Best practices and proven methodologies
+- Strategic insights and practical applications
+
+CONTEXTUAL AWARENESS:
+You have access to contextual information:
+- Relevant memories from previous interactions, through the search_memory tool when it is offered
+- Previous conversation history, given in the <history> section before each query
+
+RESPONSE METHODOLOGY:
+1. Carefully analyze the query and any provided context
+2. Identify the core issues or questions that need to be addressed
+3. Apply your expert knowledge to provide comprehensive answers
+4. Structure your response with clear logic and supporting evidence
+5. Offer actionable insights and practical recommendations when appropriate
+
+RESPONSE GUIDELINES:
+- Begin with a clear, concise summary of your main points
+- Organize information in logical sections with descriptive headings
+- Use specific examples and concrete details to illustrate key concepts
+- Address any potential counterarguments or alternative perspectives
+- Conclude with actionable recommendations or next steps
+- Maintain an authoritative yet approachable tone throughout
+
+When responding to queries, focus on providing maximum value through your expert insights while ensuring clarity and practical applicability."""
+
+# Mem0 searches repeat within a turn (tool calls, several agents); keep results briefly
+_MEMORY_SEARCH_CACHE = _TTLCache(maxsize=256, ttl=30)
+
+# Clients shared by every agent, so K agents share one set of connection pools
+
+@functools.lru_cache(maxsize=1)
+def _get_external_apis():
+    return ExternalAPIs()
+
 class RealGoogleADKAgent:
-    def __init__(self, name, expertise):
+    def __init__(self, name, expertise, use_adk: bool = True):
         self.name = name
         self.expertise = expertise
+        # With use_adk=False the agent always answers through the OpenRouter REST path
+        self.use_adk = use_adk
         self.api_key = os.getenv("OPENROUTER_API_KEY")
-        self.context_history = []
-        self.external_apis = ExternalAPIs()
-        
-        # Initialize Langfuse for observability
+        self._headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        # Without an API key there is nothing to summarize with, so evicted entries are just dropped
+        self.context_history = RollingContext(summarize=self._summarize_context if self.api_key else None)
+        self._system_prompt = _SYSTEM_PROMPT.format(name=name, expertise=expertise)
+
+    # Clients are built on first use, so constructing many agents costs no network I/O and
+    # agents that never trace, remember or call ADK never pay for those clients
+
+    @functools.cached_property
+    def external_apis(self):
+        return _get_external_apis()
+
+    @functools.cached_property
+    def langfuse(self):
+        return _get_langfuse()
+
+    @functools.cached_property
+    def memory_client(self):
+        return _get_mem0_client()
+
+    @functools.cached_property
+    def agent(self):
+        """The actual Google ADK agent, or None when ADK is unavailable or disabled"""
+        if not (self.use_adk and GOOGLE_ADK_AVAILABLE and LlmAgent and InMemoryRunner):
+            return None
         try:
-            from langfuse import Langfuse
-            self.langfuse = Langfuse(
-                public_key=os.getenv("LANGFUSE_PUBLIC_KEY"),
-                secret_key=os.getenv("LANGFUSE_SECRET_KEY"),
-                host=os.getenv("LANGFUSE_HOST", "https://cloud.langfuse.com")
+            return LlmAgent(
+                model=MODEL,
+                name=self.name,
+                description=f"Expert in {self.expertise}",
+                instruction=f"You are {self.name}, a world-class expert in {self.expertise}. Provide authoritative, accurate, and insightful responses based on your specialized expertise.",
+                tools=[self._external_api_tool, self._memory_search_tool]
             )
-        except ImportError:
-            self.langfuse = None
-        except Exception as e:
-            print(f"Warning: Langfuse initialization failed: {e}")
-            self.langfuse = None
-        
-        # Initialize Mem0 memory client
-        mem0_api_key = os.getenv("M0_API_KEY")
-        if mem0_api_key and MemoryClient:
-            try:
-                self.memory_client = MemoryClient(api_key=mem0_api_key)
-            except Exception:
-                self.memory_client = None
-        else:
-            self.memory_client = None
-            
-        # Initialize the actual Google ADK agent if available
-        if GOOGLE_ADK_AVAILABLE and LlmAgent and InMemoryRunner:
-            try:
-                self.agent = LlmAgent(
-                    model="meta-llama/llama-4-maverick:free",
-                    name=name,
-                    description=f"Expert in {expertise}",
-                    instruction=f"You are {name}, a world-class expert in {expertise}. Provide authoritative, accurate, and insightful responses based on your specialized expertise.",
-                    tools=[self._external_api_tool]
-                )
-                self.runner = InMemoryRunner(agent=self.agent, app_name=f"{name}_app")
-            except Exception:
-                self.agent = None
-                self.runner = None
-        else:
-            self.agent = None
-            self.runner = None
-        
+        except Exception:
+            return None
+
+    @functools.cached_property
+    def runner(self):
+        if self.agent is None:
+            return None
+        try:
+            return InMemoryRunner(agent=self.agent, app_name=f"{self.name}_app")
+        except Exception:
+            return None
+
     def _external_api_tool(self, query: str) -> Dict[str, Any]:
         """Tool to access external APIs"""
         try:
             # Use the external APIs to get additional information
             result = self.external_apis.search_wikipedia(query)
-            return {"status": "success", "data": result}
+            if result["data"] is None:
+                return {"status": "error", "message": result["error"]}
+            return {"status": "success", "data": result["data"]}
         except Exception as e:
             return {"status": "error", "message": str(e)}
+
+    def _memory_search_tool(self, query: str) -> Dict[str, Any]:
+        """Tool to search memories of previous interactions with the current user"""
+        if not self.memory_client:
+            return {"status": "error", "message": "Memory is not available"}
+        results = self.search_memory(_CURRENT_USER.get(), query)
+        if results is None:
+            return {"status": "error", "message": "Memory search failed"}
+        return {"status": "success", "data": _format_memories(results)}
             
     def add_to_context(self, context: str):
-        """Add context to the agent's history"""
-        self.context_history.append(context)
+        """Add context to the agent's history, evicting the oldest entry once it is full"""
+        self.context_history.append(context[:MAX_CONTEXT_ENTRY_CHARS])
         
+    def _summarize_context(self, summary: str, entries: List[str]):
+        """Fold evicted context entries into the running summary with a short LLM call"""
+        previous = f"Current summary: {summary}\n\n" if summary else ""
+        payload = {
+            "model": MODEL,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "Summarize the conversation so far in at most three sentences. Keep names, facts and open questions."
+                },
+                {
+                    "role": "user",
+                    "content": previous + "New interactions:\n" + "\n".join(entries)
+                }
+            ],
+            "max_tokens": 200
+        }
+        if not _OPENROUTER_BREAKER.allow():
+            return None
+        response = self._post(payload)
+        if response.status_code != 200:
+            return None
+        return _json(response)['choices'][0]['message']['content'][:MAX_CONTEXT_ENTRY_CHARS]
+
     def get_context(self) -> List[str]:
         """Get the current context history"""
-        return self.context_history.copy()
+        return list(self.context_history)
         
     def add_memory(self, user_id: str, message: str):
         """Add a memory using Mem0"""
@@ -100,266 +417,489 @@ class RealGoogleADKAgent:
             except Exception as e:
                 return f"Memory Error: {str(e)}"
         return "Memory client not configured"
+
+    def _queue_memory(self, user_id: str, message: str):
+        """Record an interaction in Mem0 without waiting for the write"""
+        if self.memory_client:
+            _MEMORY_WRITER.add(self.memory_client, user_id, message)
         
     def search_memory(self, user_id: str, query: str):
-        """Search memory using Mem0"""
+        """Search memory using Mem0; identical searches within 30 seconds are served from a cache"""
         if self.memory_client:
+            key = (user_id, hashlib.blake2b(query.encode(), digest_size=16).hexdigest())
+            results = _MEMORY_SEARCH_CACHE.get(key)
+            if results is not _MISS:
+                return results
             try:
                 results = self.memory_client.search(query, user_id=user_id)
-                return results
             except Exception as e:
                 return f"Memory Search Error: {str(e)}"
+            _MEMORY_SEARCH_CACHE.set(key, results)
+            return results
         return "Memory client not configured"
         
-    def respond_to_query(self, query: str, context: str = "", user_id: str = "default_user") -> Dict[str, Any]:
-        """Respond to a query using the agent's expertise"""
-        # Start Langfuse trace if available
-        trace = None
-        if self.langfuse:
-            try:
-                trace = self.langfuse.trace(
-                    name="google-adk-agent-query",
-                    user_id=user_id,
-                    metadata={
-                        "agent_name": self.name,
-                        "expertise": self.expertise,
-                        "query_length": len(query)
-                    }
-                )
-            except Exception as e:
-                print(f"Warning: Failed to create Langfuse trace: {e}")
+    async def search_memory_async(self, user_id: str, query: str):
+        """Async variant of search_memory (the Mem0 client is sync-only, so it runs in a worker thread)"""
+        return await asyncio.to_thread(self.search_memory, user_id, query)
+
+    def _start_trace(self, query: str, user_id: str, cache_hit=None):
+        """Start a Langfuse trace for a query in the background; returns a future, or None without tracing"""
+        if not self.langfuse:
+            return None
+        # Explicit ids keep Langfuse from deriving its own context for each call
+        return _LANGFUSE_EXECUTOR.submit(self._create_trace, uuid.uuid4().hex, query, user_id, cache_hit)
+
+    def _create_trace(self, trace_id, query, user_id, cache_hit=None):
+        metadata = {
+            "agent_name": self.name,
+            "expertise": self.expertise,
+            "query_length": len(query)
+        }
+        if cache_hit is not None:
+            metadata["cache_hit"] = cache_hit
+        try:
+            return self.langfuse.trace(
+                id=trace_id,
+                name="google-adk-agent-query",
+                user_id=user_id,
+                metadata=metadata
+            )
+        except Exception as e:
+            print(f"Warning: Failed to create Langfuse trace: {e}")
+            return None
+
+    def respond_to_query(self, query: str, context: Context = "", user_id: str = "default_user",
+                         cache: bool = True) -> Dict[str, Any]:
+        """Respond to a query using the agent's expertise; pass cache=False to always ask the model"""
+        key = self._response_cache_key(query, context, user_id) if cache else None
+        cached = self._cached_response(key, query, user_id)
+        if cached is not None:
+            return cached
+        trace = self._start_trace(query, user_id, cache_hit=False if key else None)
         
         # If Google ADK is available, use it
         if self.agent and self.runner:
-            try:
-                # Run the agent with the query
-                result = self.runner.run(query)
-                content = result.get("content", "No response generated")
-                
-                # Add Langfuse generation tracing if available
-                generation = None
-                if trace:
-                    try:
-                        generation = trace.generation(
-                            name="google-adk-llm-call",
-                            model="meta-llama/llama-4-maverick:free",
-                            input={
-                                "query": query,
-                                "context": context,
-                                "agent_name": self.name
-                            },
-                            output=content
-                        )
-                    except Exception as e:
-                        print(f"Warning: Failed to create Langfuse generation: {e}")
-                
-                # Add this interaction to context and memory
-                self.add_to_context(f"Query: {query} | Response: {content}")
-                
-                # Add to memory
-                if self.memory_client:
-                    self.add_memory(user_id, f"Agent {self.name} responded to query '{query}' with: {content}")
-                
-                return {
-                    "content": content,
-                    "agent": self.name,
-                    "expertise": self.expertise
-                }
-            except Exception as e:
-                error_msg = f"ADK Error: {str(e)}"
-                self.add_to_context(f"Query: {query} | Error: {error_msg}")
-                return {
-                    "error": error_msg,
-                    "agent": self.name,
-                    "expertise": self.expertise
-                }
+            response = self._adk_respond(query, context, user_id, trace)
         else:
             # Fallback to the original implementation
-            url = "https://openrouter.ai/api/v1/chat/completions"
-            
-            # Add memory if available
-            memory_context = ""
-            if self.memory_client:
-                memory_results = self.search_memory(user_id, query)
-                if isinstance(memory_results, list) and len(memory_results) > 0:
-                    memory_context = f"Relevant memories: {memory_results[:3]}"
-            
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            # Build the prompt with expertise and context
-            system_prompt = f"""You are {self.name}, a world-class expert in {self.expertise}.
+            response = self._rest_respond(query, context, user_id, trace)
+        return self._cache_response(key, response)
 
-YOUR ROLE AND RESPONSIBILITIES:
-- Provide authoritative, accurate, and insightful responses based on your specialized expertise
-- Synthesize complex information into clear, actionable recommendations
-- Draw upon your contextual knowledge and previous interactions to enhance responses
-- Maintain a professional yet accessible communication style
-
-EXPERTISE DOMAIN:
-Your specialized knowledge encompasses:
-- Deep understanding of {self.expertise}
-- Current trends and developments in your field
-- Best practices and proven methodologies
-- Strategic insights and practical applications
+    async def respond_to_query_async(self, query: str, context: Context = "", user_id: str = "default_user",
+                                     cache: bool = True) -> Dict[str, Any]:
+        """Async variant of respond_to_query, so many agents can wait on OpenRouter concurrently"""
+        key = self._response_cache_key(query, context, user_id) if cache else None
+        cached = self._cached_response(key, query, user_id)
+        if cached is not None:
+            return cached
+        trace = self._start_trace(query, user_id, cache_hit=False if key else None)
+        if self.agent and self.runner:
+            # The ADK runner is sync-only
+            response = await asyncio.to_thread(self._adk_respond, query, context, user_id, trace)
+        elif httpx is None:
+            response = await asyncio.to_thread(self._rest_respond, query, context, user_id, trace)
+        else:
+            response = await self._arest_respond(query, context, user_id, trace)
+        return self._cache_response(key, response)
 
-CONTEXTUAL AWARENESS:
-You have access to the following contextual information:
-{f"Previous conversation history: {'; '.join(self.context_history[-5:])}" if self.context_history else "No previous conversation history"}
-{memory_context if memory_context else "No relevant memories from previous interactions"}
+    def _response_cache_key(self, query, context, user_id):
+        # The prompt also carries the conversation history, and search_memory answers from the
+        # user's own memories, so neither a changed conversation nor another user can hit the entry
+        return hashlib.blake2b(
+            "\x00".join((self.name, self.expertise, user_id, self.context_history.render(),
+                          query, *_context_parts(context))).encode(), digest_size=16
+        ).hexdigest()
 
-RESPONSE METHODOLOGY:
-1. Carefully analyze the query and any provided context
-2. Identify the core issues or questions that need to be addressed
-3. Apply your expert knowledge to provide comprehensive answers
-4. Structure your response with clear logic and supporting evidence
-5. Offer actionable insights and practical recommendations when appropriate
+    def _cached_response(self, key, query, user_id):
+        """Return a copy of the cached response for key, or None on a miss or with caching off"""
+        if key is None:
+            return None
+        cached = _RESPONSE_CACHE.get(key)
+        if cached is _MISS:
+            return None
+        self._start_trace(query, user_id, cache_hit=True)
+        self.add_to_context(f"Query: {query} | Response: {_truncate(cached['content'])}")
+        return {**cached, "cached": True}
 
-RESPONSE GUIDELINES:
-- Begin with a clear, concise summary of your main points
-- Organize information in logical sections with descriptive headings
-- Use specific examples and concrete details to illustrate key concepts
-- Address any potential counterarguments or alternative perspectives
-- Conclude with actionable recommendations or next steps
-- Maintain an authoritative yet approachable tone throughout
+    @staticmethod
+    def _cache_response(key, response):
+        # Errors are never cached, so the next call retries
+        if key is not None and "error" not in response:
+            _RESPONSE_CACHE.set(key, dict(response))
+        return response
 
-When responding to queries, focus on providing maximum value through your expert insights while ensuring clarity and practical applicability."""
+    def _adk_respond(self, query, context, user_id, trace):
+        token = _CURRENT_USER.set(user_id)
+        try:
+            # Run the agent with the query
+            result = self.runner.run(query)
+            content = result.get("content", "No response generated")
             
             # Add Langfuse generation tracing if available
-            generation = None
             if trace:
-                try:
-                    generation = trace.generation(
-                        name="google-adk-fallback-llm-call",
-                        model="meta-llama/llama-4-maverick:free",
-                        input={
-                            "query": query,
-                            "context": context,
-                            "system_prompt": system_prompt[:200] + "..." if len(system_prompt) > 200 else system_prompt
-                        }
-                    )
-                except Exception as e:
-                    print(f"Warning: Failed to create Langfuse generation: {e}")
-            
-            payload = {
-                "model": "meta-llama/llama-4-maverick:free",  # Using the free Llama 4 Maverick model
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": system_prompt
+                _LANGFUSE_EXECUTOR.submit(
+                    _create_generation,
+                    trace,
+                    name="google-adk-llm-call",
+                    model=MODEL,
+                    input={
+                        "query": query,
+                        "context": context,
+                        "agent_name": self.name
                     },
-                    {
-                        "role": "user",
-                        "content": f"{context}\n\nQuery: {query}"
-                    }
-                ]
-            }
+                    output=content
+                )
             
+            # Add this interaction to context and memory
+            stored = _truncate(content)
+            self.add_to_context(f"Query: {query} | Response: {stored}")
+            
+            # Add to memory
+            self._queue_memory(user_id, f"Agent {self.name} responded to query '{query}' with: {stored}")
+            
+            return {
+                "content": content,
+                "agent": self.name,
+                "expertise": self.expertise
+            }
+        except Exception as e:
+            error_msg = f"ADK Error: {str(e)}"
+            self.add_to_context(f"Query: {query} | Error: {error_msg}")
+            return {
+                "error": error_msg,
+                "agent": self.name,
+                "expertise": self.expertise
+            }
+        finally:
+            _CURRENT_USER.reset(token)
+
+    # OpenRouter REST path, used when Google ADK is unavailable. The request and response
+    # handling is shared by the sync (requests) and async (httpx) transports.
+
+    def _start_generation(self, query, context, trace):
+        """Open the Langfuse generation for a fallback LLM call in the background, if tracing is available"""
+        if not trace:
+            return None
+        system_prompt = self._system_prompt
+        return _LANGFUSE_EXECUTOR.submit(
+            _create_generation,
+            trace,
+            name="google-adk-fallback-llm-call",
+            model=MODEL,
+            input={
+                "query": query,
+                "context": context,
+                "system_prompt": system_prompt[:200] + "..." if len(system_prompt) > 200 else system_prompt
+            }
+        )
+
+    def _rest_payload(self, query, context):
+        """Build the OpenRouter payload for a query"""
+        payload = {
+            "model": MODEL,  # Using the free Llama 4 Maverick model
+            "messages": [
+                {
+                    "role": "system",
+                    "content": [{
+                        "type": "text",
+                        "text": self._system_prompt,
+                        # Honoured by providers with explicit prompt caching, ignored by the rest
+                        "cache_control": {"type": "ephemeral"}
+                    }]
+                },
+                {
+                    "role": "user",
+                    "content": self.context_history.render()
+                },
+                {
+                    "role": "user",
+                    "content": _query_message(context, query)
+                }
+            ]
+        }
+        if self.memory_client:
+            payload["tools"] = [_MEMORY_TOOL]
+        return payload
+
+    def _tool_followup(self, payload, result, user_id):
+        """Answer the model's search_memory calls; returns the follow-up payload, or None if it made none"""
+        message = result['choices'][0]['message']
+        tool_calls = message.get('tool_calls')
+        if not tool_calls:
+            return None
+        messages = payload["messages"] + [message]
+        for call in tool_calls:
+            function = call.get("function", {})
+            # Models sometimes send prose or nothing here; only parse what looks like a JSON object
+            raw = (function.get("arguments") or "").strip()
+            arguments = {}
+            if raw[:1] == "{":
+                try:
+                    arguments = _loads(raw)
+                except ValueError:
+                    pass
+            if function.get("name") == "search_memory":
+                content = _format_memories(self.search_memory(user_id, arguments.get("query", "")))
+            else:
+                content = f"Unknown tool: {function.get('name')}"
+            messages.append({"role": "tool", "tool_call_id": call.get("id"), "content": content})
+        # One round of memory lookups is enough; make the model answer now
+        return {**payload, "messages": messages, "tool_choice": "none"}
+
+    def _concise_payload(self, query):
+        """Shorter prompt to retry with when the full one trips content moderation"""
+        return {
+            "model": MODEL,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": f"You are {self.name}, an expert in {self.expertise}. Provide a concise, professional response."
+                },
+                {
+                    "role": "user",
+                    "content": query
+                }
+            ]
+        }
+
+    def _rest_success(self, query, user_id, result, generation=None, fallback=False):
+        """Record a successful OpenRouter completion and build the agent response"""
+        content = result['choices'][0]['message']['content']
+        
+        # Update Langfuse generation with output if available
+        if generation:
+            _LANGFUSE_EXECUTOR.submit(
+                _update_generation,
+                generation,
+                output=content,
+                metadata={
+                    "response_success": True,
+                    "token_usage": result.get('usage', {})
+                }
+            )
+        
+        # Add this interaction to context and memory
+        stored = _truncate(content)
+        if fallback:
+            self.add_to_context(f"Query: {query} | Fallback Response: {stored}")
+            self._queue_memory(user_id, f"Agent {self.name} responded to query '{query}' with fallback: {stored}")
+        else:
+            self.add_to_context(f"Query: {query} | Response: {stored}")
+            self._queue_memory(user_id, f"Agent {self.name} responded to query '{query}' with: {stored}")
+        
+        response = {
+            "content": content,
+            "agent": self.name,
+            "expertise": self.expertise,
+            "token_usage": result.get('usage', {})
+        }
+        if fallback:
+            response["fallback_used"] = True
+        return response
+
+    def _rest_error(self, query, error_msg):
+        self.add_to_context(f"Query: {query} | Error: {error_msg}")
+        return {
+            "error": error_msg,
+            "agent": self.name,
+            "expertise": self.expertise,
+            "token_usage": {}
+        }
+
+    def _degraded(self, query):
+        """Response for when the OpenRouter circuit is open, returned without calling OpenRouter"""
+        response = self._rest_error(query, "Service degraded: OpenRouter is refusing or rate limiting requests, try again shortly")
+        response["degraded"] = True
+        return response
+
+    def _post(self, payload):
+        """POST a payload to OpenRouter, retrying timeouts with exponential backoff"""
+        for attempt in range(RETRY_ATTEMPTS):
+            try:
+                response = _SESSION.post(OPENROUTER_URL, headers=self._headers, data=_dumps(payload), timeout=30)
+            except requests.exceptions.Timeout:
+                if attempt + 1 < RETRY_ATTEMPTS:
+                    time.sleep(min(2 ** attempt, MAX_RETRY_BACKOFF))
+                    continue
+                _OPENROUTER_BREAKER.failure()
+                raise
+            except requests.exceptions.RequestException:
+                _OPENROUTER_BREAKER.failure()
+                raise
+            _record_openrouter_response(response)
+            return response
+
+    async def _apost(self, client, payload):
+        """Async variant of _post over the pooled httpx client"""
+        for attempt in range(RETRY_ATTEMPTS):
             try:
-                response = requests.post(url, headers=headers, json=payload, timeout=30)
+                response = await client.post(OPENROUTER_URL, headers=self._headers, content=_dumps(payload))
+            except httpx.TimeoutException:
+                if attempt + 1 < RETRY_ATTEMPTS:
+                    await asyncio.sleep(min(2 ** attempt, MAX_RETRY_BACKOFF))
+                    continue
+                _OPENROUTER_BREAKER.failure()
+                raise
+            except httpx.HTTPError:
+                _OPENROUTER_BREAKER.failure()
+                raise
+            _record_openrouter_response(response)
+            return response
+
+    def _rest_respond(self, query, context, user_id, trace):
+        if not _OPENROUTER_BREAKER.allow():
+            return self._degraded(query)
+        generation = self._start_generation(query, context, trace)
+        try:
+            if _MODERATION_PATTERNS.search(query):
+                response = self._post(self._concise_payload(query))
                 if response.status_code == 200:
-                    result = response.json()
-                    content = result['choices'][0]['message']['content']
-                    
-                    # Update Langfuse generation with output if available
-                    if generation:
-                        try:
-                            generation.update(
-                                output=content,
-                                metadata={
-                                    "response_success": True,
-                                    "token_usage": result.get('usage', {})
-                                }
-                            )
-                        except Exception as e:
-                            print(f"Warning: Failed to update Langfuse generation: {e}")
-                    
-                    # Add this interaction to context and memory
-                    self.add_to_context(f"Query: {query} | Response: {content}")
-                    
-                    # Add to memory
-                    if self.memory_client:
-                        self.add_memory(user_id, f"Agent {self.name} responded to query '{query}' with: {content}")
-                    
-                    return {
-                        "content": content,
-                        "agent": self.name,
-                        "expertise": self.expertise,
-                        "token_usage": result.get('usage', {})
-                    }
-                elif response.status_code == 403:
-                    # Handle content moderation errors
-                    error_response = response.json()
-                    if "moderation" in error_response.get("error", {}).get("message", "").lower():
-                        # Try with a less specific prompt
-                        fallback_payload = {
-                            "model": "meta-llama/llama-4-maverick:free",
-                            "messages": [
-                                {
-                                    "role": "system",
-                                    "content": f"You are {self.name}, an expert in {self.expertise}. Provide a concise, professional response."
-                                },
-                                {
-                                    "role": "user",
-                                    "content": query
-                                }
-                            ]
-                        }
-                        
-                        fallback_response = requests.post(url, headers=headers, json=fallback_payload, timeout=30)
+                    return self._rest_success(query, user_id, _json(response), generation, fallback=True)
+                return self._rest_error(query, f"API Error: {response.status_code} - {response.text}")
+            payload = self._rest_payload(query, context)
+            response = self._post(payload)
+            if response.status_code == 200:
+                result = _json(response)
+                followup = self._tool_followup(payload, result, user_id)
+                if followup is None:
+                    return self._rest_success(query, user_id, result, generation)
+                # The model asked for memories; send them back so it can finish its answer
+                response = self._post(followup)
+                if response.status_code == 200:
+                    return self._rest_success(query, user_id, _json(response), generation)
+            # Handle content moderation errors by retrying with a less specific prompt
+            if _is_moderation_block(response):
+                fallback_response = self._post(self._concise_payload(query))
+                if fallback_response.status_code == 200:
+                    return self._rest_success(query, user_id, _json(fallback_response), fallback=True)
+            return self._rest_error(query, f"API Error: {response.status_code} - {response.text}")
+        except requests.exceptions.RequestException as e:
+            return self._rest_error(query, f"Network Error: {str(e)}")
+        except Exception as e:
+            return self._rest_error(query, f"Unexpected Error: {str(e)}")
+
+    async def _arest_respond(self, query, context, user_id, trace):
+        if not _OPENROUTER_BREAKER.allow():
+            return self._degraded(query)
+        generation = self._start_generation(query, context, trace)
+        client = await _ASYNC_CLIENTS.get()
+        try:
+            if _MODERATION_PATTERNS.search(query):
+                response = await self._apost(client, self._concise_payload(query))
+                if response.status_code == 200:
+                    return await asyncio.to_thread(
+                        self._rest_success, query, user_id, _json(response), generation, True
+                    )
+                return self._rest_error(query, f"API Error: {response.status_code} - {response.text}")
+            payload = self._rest_payload(query, context)
+            response = await self._apost(client, payload)
+            if response.status_code == 200:
+                result = _json(response)
+                # Mem0 is blocking, so any memory lookups the model asks for run in a worker thread
+                followup = await asyncio.to_thread(self._tool_followup, payload, result, user_id)
+                if followup is None:
+                    return await asyncio.to_thread(self._rest_success, query, user_id, result, generation)
+                response = await self._apost(client, followup)
+                if response.status_code == 200:
+                    return await asyncio.to_thread(self._rest_success, query, user_id, _json(response), generation)
+            if _is_moderation_block(response):
+                fallback_response = await self._apost(client, self._concise_payload(query))
+                if fallback_response.status_code == 200:
+                    return await asyncio.to_thread(
+                        self._rest_success, query, user_id, _json(fallback_response), None, True
+                    )
+            return self._rest_error(query, f"API Error: {response.status_code} - {response.text}")
+        except httpx.HTTPError as e:
+            return self._rest_error(query, f"Network Error: {str(e)}")
+        except Exception as e:
+            return self._rest_error(query, f"Unexpected Error: {str(e)}")
+
+    async def respond_to_query_stream(self, query: str, context: Context = "",
+                                      user_id: str = "default_user") -> AsyncIterator[str]:
+        """Yield the response to a query as it is generated
+
+        Only the OpenRouter REST path streams (without the memory tool); with ADK, without httpx, or
+        for queries that go straight to the concise prompt, the full response is yielded at once.
+        Errors are yielded as their message, as the final chunk.
+        """
+        if (self.agent and self.runner) or httpx is None or _MODERATION_PATTERNS.search(query):
+            result = await self.respond_to_query_async(query, context, user_id)
+            yield result["content"] if "content" in result else result["error"]
+            return
+
+        if not _OPENROUTER_BREAKER.allow():
+            yield self._degraded(query)["error"]
+            return
+        trace = self._start_trace(query, user_id)
+        generation = self._start_generation(query, context, trace)
+        payload = self._rest_payload(query, context)
+        payload.pop("tools", None)
+        payload["stream"] = True
+        client = await _ASYNC_CLIENTS.get()
+        parts = []
+        usage = {}
+        try:
+            async with client.stream(
+                "POST", OPENROUTER_URL, headers=self._headers, content=_dumps(payload)
+            ) as response:
+                if response.status_code != 200:
+                    # Read the body first; the breaker needs it to tell moderation blocks apart
+                    await response.aread()
+                    _record_openrouter_response(response)
+                    if _is_moderation_block(response):
+                        fallback_response = await self._apost(client, self._concise_payload(query))
                         if fallback_response.status_code == 200:
-                            fallback_result = fallback_response.json()
-                            content = fallback_result['choices'][0]['message']['content']
-                            
-                            self.add_to_context(f"Query: {query} | Fallback Response: {content}")
-                            if self.memory_client:
-                                self.add_memory(user_id, f"Agent {self.name} responded to query '{query}' with fallback: {content}")
-                            
-                            return {
-                                "content": content,
-                                "agent": self.name,
-                                "expertise": self.expertise,
-                                "token_usage": fallback_result.get('usage', {}),
-                                "fallback_used": True
-                            }
-                    
-                    error_msg = f"API Error: {response.status_code} - {response.text}"
-                    self.add_to_context(f"Query: {query} | Error: {error_msg}")
-                    return {
-                        "error": error_msg,
-                        "agent": self.name,
-                        "expertise": self.expertise,
-                        "token_usage": {}
-                    }
-                else:
-                    error_msg = f"API Error: {response.status_code} - {response.text}"
-                    self.add_to_context(f"Query: {query} | Error: {error_msg}")
-                    return {
-                        "error": error_msg,
-                        "agent": self.name,
-                        "expertise": self.expertise,
-                        "token_usage": {}
-                    }
-            except requests.exceptions.RequestException as e:
-                error_msg = f"Network Error: {str(e)}"
-                self.add_to_context(f"Query: {query} | Error: {error_msg}")
-                return {
-                    "error": error_msg,
-                    "agent": self.name,
-                    "expertise": self.expertise,
-                    "token_usage": {}
-                }
-            except Exception as e:
-                error_msg = f"Unexpected Error: {str(e)}"
-                self.add_to_context(f"Query: {query} | Error: {error_msg}")
-                return {
-                    "error": error_msg,
-                    "agent": self.name,
-                    "expertise": self.expertise,
-                    "token_usage": {}
-                }
+                            result = await asyncio.to_thread(
+                                self._rest_success, query, user_id, _json(fallback_response), None, True
+                            )
+                            yield result["content"]
+                            return
+                    yield self._rest_error(query, f"API Error: {response.status_code} - {response.text}")["error"]
+                    return
+                _record_openrouter_response(response)
+                async for line in response.aiter_lines():
+                    # Server-sent events; lines without a data field are keep-alive comments
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = _loads(data)
+                    usage = chunk.get("usage") or usage
+                    choices = chunk.get("choices") or [{}]
+                    token = choices[0].get("delta", {}).get("content")
+                    if token:
+                        parts.append(token)
+                        yield token
+        except httpx.HTTPError as e:
+            _OPENROUTER_BREAKER.failure()
+            yield self._rest_error(query, f"Network Error: {str(e)}")["error"]
+            return
+        except Exception as e:
+            yield self._rest_error(query, f"Unexpected Error: {str(e)}")["error"]
+            return
+
+        # Record the streamed answer the same way as a non-streamed completion
+        result = {"choices": [{"message": {"content": "".join(parts)}}], "usage": usage}
+        await asyncio.to_thread(self._rest_success, query, user_id, result, generation)
+
+class SimpleGoogleADKAgent(RealGoogleADKAgent):
+    """Agent that skips Google ADK and always uses the OpenRouter REST path"""
+    def __init__(self, name, expertise):
+        super().__init__(name, expertise, use_adk=False)
+
+async def gather_responses(agents, query: str, context: Context = "", user_id: str = "default_user") -> List[Dict[str, Any]]:
+    """Ask several agents the same query concurrently; results are in the same order as agents"""
+    return await asyncio.gather(*[agent.respond_to_query_async(query, context, user_id) for agent in agents])
+
+def respond_to_queries_batch(agents, query: str, context: Context = "", user_id: str = "default_user") -> List[Dict[str, Any]]:
+    """Sync entry point for fanning one query out to several agents in a single concurrent round
+
+    Each agent has its own system prompt and history, so the completions stay separate requests,
+    but they go out together over the pooled client (one multiplexed connection with HTTP/2).
+    Must not be called from a running event loop; await gather_responses there instead.
+    """
+    return asyncio.run(gather_responses(agents, query, context, user_id))
 
 # Example usage
 if __name__ == "__main__":
@@ -1,107 +1,238 @@
 import os
 import json
+import atexit
+import logging
+import asyncio
+import hashlib
+import functools
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from typing import Dict, Any, List, Optional, TypedDict
-from agents.external_apis import ExternalAPIs
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator
+from agents.external_apis import ExternalAPIs, _TTLCache, _MISS
+from agents._memory_writer import MEMORY_WRITER
+from agents._shared import (
+    get_langfuse as _get_langfuse, get_mem0_client as _get_mem0_client,
+    is_moderation_error as _is_moderation_error, json_default as _json_default
+)
 
-# Try to import LangGraph components
+def _has_module(name: str) -> bool:
+    return importlib.util.find_spec(name) is not None
+
+# LangGraph and langchain_openai are only checked for here; they are imported on first use,
+# since they pull in heavy transitive dependencies
+LANGGRAPH_AVAILABLE = _has_module("langgraph") and _has_module("langchain_core")
+OPENAI_AVAILABLE = _has_module("langchain_openai")
+
+@functools.lru_cache(maxsize=1)
+def _lazy_langgraph():
+    """Import the LangGraph components on first use"""
+    from langgraph.graph import StateGraph, START, END
+    from langchain_core.runnables import RunnableLambda
+    return StateGraph, START, END, RunnableLambda
+
+# httpx is optional; with it the model's OpenRouter calls share one tuned connection pool
 try:
-    from langgraph.graph import StateGraph, END
-    from langchain_core.messages import HumanMessage, AIMessage
-    LANGGRAPH_AVAILABLE = True
+    import httpx
 except ImportError:
-    StateGraph = None
-    END = None
-    HumanMessage = None
-    AIMessage = None
-    LANGGRAPH_AVAILABLE = False
+    httpx = None
 
-# Try to import ChatOpenAI, but provide fallback if not available
+# h2 is optional; with it concurrent OpenRouter calls share one HTTP/2 connection
 try:
-    from langchain_openai import ChatOpenAI
-    OPENAI_AVAILABLE = True
+    import h2
 except ImportError:
-    ChatOpenAI = None
-    OPENAI_AVAILABLE = False
+    h2 = None
+
+# orjson is optional; it serializes inputs several times faster than the stdlib
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Load environment variables
 load_dotenv()
 
-# Define the state structure
-class AgentState(TypedDict):
-    input_data: Dict[str, Any]
-    analysis: str
-    patterns: List[str]
-    insights: List[str]
-    recommendations: List[str]
-    user_id: str
+logger = logging.getLogger(__name__)
+
+# Fail fast on connect, but give the model time to answer
+MODEL_TIMEOUT = httpx.Timeout(27, connect=3.05) if httpx else 30
+MODEL_MAX_RETRIES = 3
+
+# Define the state structure. Nodes read its fields and return dicts of the fields they update.
+# (slots=True would need Python 3.10; the image runs 3.9.)
+@dataclass(frozen=True)
+class AgentState:
+    input_data: Dict[str, Any] = field(default_factory=dict)
+    input_json: str = ""
+    user_id: str = "default_user"
+    analysis: str = ""
+    patterns: List[str] = field(default_factory=list)
+    insights: List[str] = field(default_factory=list)
+    recommendations: List[str] = field(default_factory=list)
+    memories: str = ""
+    content: Dict[str, Any] = field(default_factory=dict)
+
+# Prompts, shared by every agent and by the sync and async paths
+_ANALYZE_PROMPT = "Analyze the following data and identify key patterns and insights: {input}"
+_RECOMMEND_PROMPT = "Based on this analysis: {analysis}, generate actionable recommendations.{memories}"
+# Simpler prompts for the fallback pipeline, less likely to trip content moderation
+_SIMPLE_ANALYZE_PROMPT = "Analyze: {task}"
+_SIMPLE_RECOMMEND_PROMPT = "Recommendations based on: {analysis}{memories}"
+
+def _input_json(input_data: Dict[str, Any]) -> str:
+    """Serialize an input once per call, for the prompt, the memory search and the memory record.
+    Keys are sorted so equal inputs always serialize the same way."""
+    if orjson:
+        return orjson.dumps(
+            input_data,
+            default=_json_default,
+            option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        ).decode()
+    return json.dumps(input_data, default=_json_default, sort_keys=True)
+
+# Langfuse calls run here, off the request path. A single worker keeps each trace's
+# create/span/update calls in submission order.
+_LANGFUSE_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="langgraph-langfuse")
+atexit.register(_LANGFUSE_EXECUTOR.shutdown, wait=True)
+
+def _create_span(trace_future, **kwargs):
+    """Create a Langfuse span once its trace has been created"""
+    trace = trace_future.result()
+    if not trace:
+        return None
+    try:
+        return trace.span(**kwargs)
+    except Exception as e:
+        logger.warning("Failed to create Langfuse span: %s", e)
+        return None
+
+def _update_span(span_future, **kwargs):
+    """Update a Langfuse span once its creation has finished"""
+    span = span_future.result()
+    if span:
+        try:
+            span.update(**kwargs)
+        except Exception as e:
+            logger.warning("Failed to update Langfuse span: %s", e)
+
+# Model completions, keyed by a hash of the prompt and shared by every agent
+_COMPLETION_CACHE = _TTLCache(maxsize=2048, ttl=3600)
+
+# Runs Mem0 searches alongside the analysis call in the sync simple pipeline
+_MEMORY_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="langgraph-memory")
+
+def _format_memories(memory_results) -> str:
+    """Render Mem0 search results for the recommendation prompt, or "" without any"""
+    if isinstance(memory_results, list) and len(memory_results) > 0:
+        return f" Relevant memories from previous interactions: {memory_results[:3]}"
+    return ""
+
+@functools.lru_cache(maxsize=1)
+def _get_external_apis():
+    return ExternalAPIs()
+
+@functools.lru_cache(maxsize=1)
+def _get_model():
+    """Shared ChatOpenAI model pointed at OpenRouter, or None without langchain_openai or an OPENROUTER_API_KEY"""
+    api_key = os.getenv("OPENROUTER_API_KEY")
+    if not (OPENAI_AVAILABLE and api_key):
+        return None
+    try:
+        from langchain_openai import ChatOpenAI
+    except ImportError:
+        return None
+    kwargs = {}
+    if httpx is not None:
+        # Keep-alive pool for the sync calls. The async client is left to ChatOpenAI,
+        # since an httpx.AsyncClient cannot be shared across event loops.
+        kwargs["http_client"] = httpx.Client(
+            http2=h2 is not None,
+            timeout=MODEL_TIMEOUT,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+        )
+    try:
+        return ChatOpenAI(
+            model="meta-llama/llama-4-maverick:free",
+            openai_api_key=api_key,
+            openai_api_base="https://openrouter.ai/api/v1",
+            timeout=MODEL_TIMEOUT,
+            # Connection errors, 408/409/429 and 5xx responses are retried with exponential backoff
+            max_retries=MODEL_MAX_RETRIES,
+            **kwargs
+        )
+    except Exception:
+        return None
+
+def _node(name: str):
+    """Graph node that runs the named method, or its async variant under ainvoke,
+    on the agent passed in the run's config"""
+    RunnableLambda = _lazy_langgraph()[3]
+    def func(state, config):
+        return getattr(config["configurable"]["agent"], name)(state)
+    async def afunc(state, config):
+        return await getattr(config["configurable"]["agent"], "_a" + name[1:])(state)
+    return RunnableLambda(func, afunc=afunc)
+
+@functools.lru_cache(maxsize=1)
+def _get_app():
+    """The compiled graph, shared by every agent, or None when LangGraph is unavailable"""
+    if not LANGGRAPH_AVAILABLE:
+        return None
+    try:
+        StateGraph, START, END, _ = _lazy_langgraph()
+        graph = StateGraph(AgentState)
+        
+        # Add nodes to the graph
+        graph.add_node("analyze", _node("_analyze_node"))
+        graph.add_node("prefetch_memory", _node("_prefetch_memory_node"))
+        graph.add_node("generate_response", _node("_generate_response_node"))
+        
+        # Add edges: the memory search runs in parallel with the analysis,
+        # and generate_response waits for both
+        graph.add_edge(START, "analyze")
+        graph.add_edge(START, "prefetch_memory")
+        graph.add_edge(["analyze", "prefetch_memory"], "generate_response")
+        graph.add_edge("generate_response", END)
+        
+        # Compile the graph
+        return graph.compile()
+    except Exception:
+        return None
 
 class RealLangGraphAgent:
     def __init__(self, name: str, capabilities: List[str]):
         self.name = name
         self.capabilities = capabilities
         self.state = {}
-        self.external_apis = ExternalAPIs()
-        
-        # Initialize Langfuse for observability
-        try:
-            from langfuse import Langfuse
-            self.langfuse = Langfuse(
-                public_key=os.getenv("LANGFUSE_PUBLIC_KEY"),
-                secret_key=os.getenv("LANGFUSE_SECRET_KEY"),
-                host=os.getenv("LANGFUSE_HOST", "https://cloud.langfuse.com")
-            )
-        except ImportError:
-            self.langfuse = None
-        except Exception as e:
-            print(f"Warning: Langfuse initialization failed: {e}")
-            self.langfuse = None
+        # Mem0 search results, keyed by user, that user's memory generation and the query hash.
+        # Adding a memory bumps the user's generation, so their older results are never served again.
+        self._memory_cache = _TTLCache(maxsize=1024, ttl=60)
+        self._memory_generation: Dict[str, int] = {}
+        # Recent results, keyed by user and a hash of the serialized input
+        self._result_cache = _TTLCache(maxsize=256, ttl=300)
         
-        # Initialize Mem0 memory client
-        mem0_api_key = os.getenv("M0_API_KEY")
-        try:
-            from mem0 import MemoryClient
-            if mem0_api_key:
-                self.memory_client = MemoryClient(api_key=mem0_api_key)
-            else:
-                self.memory_client = None
-        except ImportError:
-            self.memory_client = None
-        
-        # Initialize the model if available
-        if OPENAI_AVAILABLE and ChatOpenAI:
-            try:
-                self.model = ChatOpenAI(
-                    model="meta-llama/llama-4-maverick:free",
-                    openai_api_key=os.getenv("OPENROUTER_API_KEY"),
-                    openai_api_base="https://openrouter.ai/api/v1"
-                )
-            except Exception:
-                self.model = None
-        else:
-            self.model = None
-        
-        # Initialize the graph if LangGraph is available
-        if LANGGRAPH_AVAILABLE and StateGraph and END:
-            try:
-                # Initialize the graph
-                self.graph = StateGraph(AgentState)
-                
-                # Add nodes to the graph
-                self.graph.add_node("analyze", self._analyze_node)
-                self.graph.add_node("generate_response", self._generate_response_node)
-                
-                # Add edges
-                self.graph.add_edge("analyze", "generate_response")
-                self.graph.set_entry_point("analyze")
-                self.graph.add_edge("generate_response", END)
-                
-                # Compile the graph
-                self.app = self.graph.compile()
-            except Exception:
-                self.app = None
-        else:
-            self.app = None
+        # The compiled graph is shared; its nodes find this agent through the run's config
+        self.app = _get_app()
+
+    # Clients are shared by every agent and built on first use, so constructing
+    # an agent costs no network I/O or config parsing
+
+    @functools.cached_property
+    def external_apis(self):
+        return _get_external_apis()
+
+    @functools.cached_property
+    def langfuse(self):
+        return _get_langfuse()
+
+    @functools.cached_property
+    def memory_client(self):
+        return _get_mem0_client()
+
+    @functools.cached_property
+    def model(self):
+        return _get_model()
         
     def update_state(self, key: str, value: Any):
         """Update the agent's state"""
@@ -116,46 +247,112 @@ class RealLangGraphAgent:
         if self.memory_client:
             try:
                 result = self.memory_client.add(message, user_id=user_id)
-                return result
             except Exception as e:
                 return f"Memory Error: {str(e)}"
+            self._bump_memory_generation(user_id)
+            return result
         return "Memory client not configured"
+
+    def _bump_memory_generation(self, user_id: str):
+        self._memory_generation[user_id] = self._memory_generation.get(user_id, 0) + 1
         
     def search_memory(self, user_id: str, query: str):
-        """Search memory using Mem0"""
+        """Search memory using Mem0; repeat searches within 60 seconds are served from a cache"""
         if self.memory_client:
+            key = (
+                user_id,
+                self._memory_generation.get(user_id, 0),
+                hashlib.blake2b(query.encode(), digest_size=16).hexdigest()
+            )
+            results = self._memory_cache.get(key)
+            if results is not _MISS:
+                return results
             try:
                 results = self.memory_client.search(query, user_id=user_id)
-                return results
             except Exception as e:
                 return f"Memory Search Error: {str(e)}"
+            self._memory_cache.set(key, results)
+            return results
         return "Memory client not configured"
         
+    # Model completions are cached by prompt, across agents, so a repeated analysis (or the
+    # moderation fallback re-running the same simple prompt) skips the LLM round trip
+
+    def _complete(self, prompt: str) -> str:
+        key = hashlib.blake2b(prompt.encode(), digest_size=16).hexdigest()
+        content = _COMPLETION_CACHE.get(key)
+        if content is _MISS:
+            content = self.model.invoke(prompt).content
+            _COMPLETION_CACHE.set(key, content)
+        return content
+
+    async def _acomplete(self, prompt: str) -> str:
+        """Async variant of _complete"""
+        key = hashlib.blake2b(prompt.encode(), digest_size=16).hexdigest()
+        content = _COMPLETION_CACHE.get(key)
+        if content is _MISS:
+            content = (await self.model.ainvoke(prompt)).content
+            _COMPLETION_CACHE.set(key, content)
+        return content
+
+    @staticmethod
+    def _default_analysis(input_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "analysis": f"Analysis of {input_data.get('task', 'data')}",
+            "patterns": ["Pattern 1", "Pattern 2"],
+            "insights": ["Insight 1", "Insight 2"]
+        }
+
     def _analyze_node(self, state: AgentState) -> Dict[str, Any]:
         """Analyze the input data"""
-        input_data = state["input_data"]
-        
-        # Perform analysis using external APIs if needed
-        analysis = f"Analysis of {input_data.get('task', 'data')}"
-        patterns = ["Pattern 1", "Pattern 2"]
-        insights = ["Insight 1", "Insight 2"]
+        input_data = state.input_data
+        result = self._default_analysis(input_data)
         
         # If we have a model, use it for analysis
         if self.model:
             try:
-                prompt = f"Analyze the following data and identify key patterns and insights: {input_data}"
-                if HumanMessage:
-                    response = self.model.invoke([HumanMessage(content=prompt)])
-                    analysis = response.content
+                prompt = _ANALYZE_PROMPT.format(input=state.input_json)
+                result["analysis"] = self._complete(prompt)
             except Exception as e:
-                analysis = f"Analysis failed: {str(e)}"
+                result["analysis"] = f"Analysis failed: {str(e)}"
         
-        return {
-            "analysis": analysis,
-            "patterns": patterns,
-            "insights": insights
-        }
+        return result
+
+    async def _aanalyze_node(self, state: AgentState) -> Dict[str, Any]:
+        """Async variant of _analyze_node"""
+        input_data = state.input_data
+        result = self._default_analysis(input_data)
+        if self.model:
+            try:
+                prompt = _ANALYZE_PROMPT.format(input=state.input_json)
+                result["analysis"] = await self._acomplete(prompt)
+            except Exception as e:
+                result["analysis"] = f"Analysis failed: {str(e)}"
+        return result
+    
+    def _prefetch_memory_node(self, state: AgentState) -> Dict[str, Any]:
+        """Search memories relevant to the input"""
+        if not self.memory_client:
+            return {"memories": ""}
+        return {"memories": _format_memories(self.search_memory(state.user_id, state.input_json))}
+
+    async def _aprefetch_memory_node(self, state: AgentState) -> Dict[str, Any]:
+        """Async variant of _prefetch_memory_node (the Mem0 client is sync-only, so it runs in a worker thread)"""
+        if not self.memory_client:
+            return {"memories": ""}
+        return await asyncio.to_thread(self._prefetch_memory_node, state)
     
+    @staticmethod
+    def _final_response(state: AgentState, recommendations: List[str]) -> Dict[str, Any]:
+        response = {
+            "analysis": state.analysis,
+            "patterns": state.patterns,
+            "insights": state.insights,
+            "recommendations": recommendations
+        }
+        
+        return {"content": response}
+
     def _generate_response_node(self, state: AgentState) -> Dict[str, Any]:
         """Generate the final response"""
         recommendations = ["Recommendation 1", "Recommendation 2"]
@@ -163,190 +360,320 @@ class RealLangGraphAgent:
         # If we have a model, use it for generating recommendations
         if self.model:
             try:
-                prompt = f"Based on this analysis: {state.get('analysis', '')}, generate actionable recommendations."
-                if HumanMessage:
-                    response = self.model.invoke([HumanMessage(content=prompt)])
-                    recommendations = [response.content]
+                prompt = _RECOMMEND_PROMPT.format(analysis=state.analysis, memories=state.memories)
+                recommendations = [self._complete(prompt)]
             except Exception as e:
                 recommendations = [f"Recommendation generation failed: {str(e)}"]
         
-        response = {
-            "analysis": state.get("analysis", ""),
-            "patterns": state.get("patterns", []),
-            "insights": state.get("insights", []),
-            "recommendations": recommendations
-        }
-        
-        return {"content": response}
-    
-    def process_input(self, input_data: Dict[str, Any], user_id: str = "default_user") -> Dict[str, Any]:
-        """Process input using the LangGraph framework"""
-        # Start Langfuse trace if available
-        trace = None
-        if self.langfuse:
+        return self._final_response(state, recommendations)
+
+    async def _agenerate_response_node(self, state: AgentState) -> Dict[str, Any]:
+        """Async variant of _generate_response_node"""
+        recommendations = ["Recommendation 1", "Recommendation 2"]
+        if self.model:
             try:
-                trace = self.langfuse.trace(
-                    name="langgraph-agent-processing",
-                    user_id=user_id,
-                    metadata={
-                        "agent_name": self.name,
-                        "capabilities": self.capabilities,
-                        "input_type": input_data.get("type", "unknown")
-                    }
-                )
+                prompt = _RECOMMEND_PROMPT.format(analysis=state.analysis, memories=state.memories)
+                recommendations = [await self._acomplete(prompt)]
             except Exception as e:
-                print(f"Warning: Failed to create Langfuse trace: {e}")
+                recommendations = [f"Recommendation generation failed: {str(e)}"]
+        return self._final_response(state, recommendations)
+
+    # Without LangGraph, or when the graph's prompts trip content moderation, the agent runs a
+    # simpler two-call pipeline: a minimal analysis prompt, then recommendations based on it
+
+    def _simple_pipeline(self, input_data: Dict[str, Any], input_json: str, user_id: str,
+                         trace, failure_label: str) -> Dict[str, Any]:
+        """Run the simple analysis/recommendation pipeline (it is not traced)"""
+        result = self._default_analysis(input_data)
+        result["recommendations"] = ["Recommendation 1", "Recommendation 2"]
         
-        # If LangGraph is available, use it
-        if self.app:
+        # If we have a model, use it with the simpler prompts
+        if self.model:
+            memories = None
+            if self.memory_client:
+                memories = _MEMORY_EXECUTOR.submit(self.search_memory, user_id, input_json)
             try:
-                # Initialize the state
-                initial_state = {
-                    "input_data": input_data,
-                    "user_id": user_id
-                }
-                
-                # Add Langfuse span for graph execution if available
-                span = None
-                if trace:
-                    try:
-                        span = trace.span(
-                            name="langgraph-execution",
-                            input=initial_state
-                        )
-                    except Exception as e:
-                        print(f"Warning: Failed to create Langfuse span: {e}")
-                
-                # Run the graph
-                result = self.app.invoke(initial_state)
+                result["analysis"] = self._complete(_SIMPLE_ANALYZE_PROMPT.format(task=input_data.get("task", "data")))
                 
-                # Update Langfuse span with output if available
-                if span:
-                    try:
-                        span.update(
-                            output=result.get("content", {}),
-                            metadata={
-                                "execution_success": True,
-                                "agent_name": self.name
-                            }
-                        )
-                    except Exception as e:
-                        print(f"Warning: Failed to update Langfuse span: {e}")
-                
-                # Add to memory
-                if self.memory_client:
-                    self.add_memory(user_id, f"Agent {self.name} processed: {input_data} and responded: {result.get('content', {})}")
-                
-                return {
-                    "content": result.get("content", {}),
-                    "agent": self.name,
-                    "capabilities": self.capabilities
-                }
+                memory_context = _format_memories(memories.result()) if memories else ""
+                result["recommendations"] = [self._complete(
+                    _SIMPLE_RECOMMEND_PROMPT.format(analysis=result["analysis"], memories=memory_context)
+                )]
             except Exception as e:
-                # Handle content moderation errors specifically
-                error_str = str(e).lower()
-                if "403" in error_str and ("moderation" in error_str or "flagged" in error_str):
-                    # Try with a simpler prompt in the fallback implementation
-                    try:
-                        # Use the fallback implementation with a simpler approach
-                        analysis = f"Analysis of {input_data.get('task', 'data')}"
-                        patterns = ["Pattern 1", "Pattern 2"]
-                        insights = ["Insight 1", "Insight 2"]
-                        recommendations = ["Recommendation 1", "Recommendation 2"]
-                        
-                        # If we have a model, use it with a simpler prompt
-                        if self.model:
-                            try:
-                                # Simple analysis with minimal prompt
-                                prompt = f"Analyze: {input_data.get('task', 'data')}"
-                                if HumanMessage:
-                                    response = self.model.invoke([HumanMessage(content=prompt)])
-                                    analysis = response.content
-                                
-                                # Simple recommendations
-                                prompt = f"Recommendations based on: {analysis}"
-                                if HumanMessage:
-                                    response = self.model.invoke([HumanMessage(content=prompt)])
-                                    recommendations = [response.content]
-                            except Exception as model_e:
-                                analysis = f"Analysis with simplified prompt failed: {str(model_e)}"
-                                recommendations = [f"Recommendation generation failed: {str(model_e)}"]
-                        
-                        response = {
-                            "analysis": analysis,
-                            "patterns": patterns,
-                            "insights": insights,
-                            "recommendations": recommendations
-                        }
-                        
-                        # Add to memory
-                        if self.memory_client:
-                            self.add_memory(user_id, f"Agent {self.name} processed: {input_data} with fallback and responded: {response}")
-                        
-                        return {
-                            "content": response,
-                            "agent": self.name,
-                            "capabilities": self.capabilities,
-                            "fallback_used": True
-                        }
-                    except Exception as fallback_e:
-                        return {
-                            "error": f"Error processing input (fallback also failed): {str(e)} | Fallback error: {str(fallback_e)}",
-                            "agent": self.name,
-                            "capabilities": self.capabilities
-                        }
-                else:
-                    return {
-                        "error": f"Error processing input: {str(e)}",
-                        "agent": self.name,
-                        "capabilities": self.capabilities
-                    }
-        else:
-            # Fallback implementation
+                result["analysis"] = f"{failure_label}: {str(e)}"
+                result["recommendations"] = [f"Recommendation generation failed: {str(e)}"]
+        
+        return result
+
+    async def _asearch_memory_context(self, user_id: str, input_json: str) -> str:
+        if not self.memory_client:
+            return ""
+        return _format_memories(await asyncio.to_thread(self.search_memory, user_id, input_json))
+
+    async def _asimple_pipeline(self, input_data: Dict[str, Any], input_json: str, user_id: str,
+                                trace, failure_label: str) -> Dict[str, Any]:
+        """Async variant of _simple_pipeline"""
+        result = self._default_analysis(input_data)
+        result["recommendations"] = ["Recommendation 1", "Recommendation 2"]
+        if self.model:
             try:
-                # Simple implementation without LangGraph
-                analysis = f"Analysis of {input_data.get('task', 'data')}"
-                patterns = ["Pattern 1", "Pattern 2"]
-                insights = ["Insight 1", "Insight 2"]
-                recommendations = ["Recommendation 1", "Recommendation 2"]
-                
-                # If we have a model, use it
-                if self.model:
-                    try:
-                        # Analysis with a simpler prompt to avoid moderation issues
-                        prompt = f"Analyze: {input_data.get('task', 'data')}"
-                        if HumanMessage:
-                            response = self.model.invoke([HumanMessage(content=prompt)])
-                            analysis = response.content
-                        
-                        # Recommendations with a simpler prompt
-                        prompt = f"Recommendations based on: {analysis}"
-                        if HumanMessage:
-                            response = self.model.invoke([HumanMessage(content=prompt)])
-                            recommendations = [response.content]
-                    except Exception as e:
-                        analysis = f"Analysis failed: {str(e)}"
-                        recommendations = [f"Recommendation generation failed: {str(e)}"]
-                
-                response = {
-                    "analysis": analysis,
-                    "patterns": patterns,
-                    "insights": insights,
-                    "recommendations": recommendations
-                }
-                
-                # Add to memory
-                if self.memory_client:
-                    self.add_memory(user_id, f"Agent {self.name} processed: {input_data} and responded: {response}")
+                # The memory search overlaps the analysis call
+                result["analysis"], memory_context = await asyncio.gather(
+                    self._acomplete(_SIMPLE_ANALYZE_PROMPT.format(task=input_data.get("task", "data"))),
+                    self._asearch_memory_context(user_id, input_json)
+                )
                 
-                return {
-                    "content": response,
-                    "agent": self.name,
-                    "capabilities": self.capabilities
-                }
+                result["recommendations"] = [await self._acomplete(
+                    _SIMPLE_RECOMMEND_PROMPT.format(analysis=result["analysis"], memories=memory_context)
+                )]
             except Exception as e:
-                return {
-                    "error": f"Error processing input: {str(e)}",
-                    "agent": self.name,
-                    "capabilities": self.capabilities
-                }
+                result["analysis"] = f"{failure_label}: {str(e)}"
+                result["recommendations"] = [f"Recommendation generation failed: {str(e)}"]
+        return result
+
+    # Langfuse calls run on a background worker so tracing never blocks processing;
+    # traces and spans are passed around as futures
+
+    def _start_trace(self, input_data: Dict[str, Any], user_id: str):
+        """Start a Langfuse trace for an input; returns a future, or None without Langfuse"""
+        if not self.langfuse:
+            return None
+        metadata = {
+            "agent_name": self.name,
+            "capabilities": self.capabilities,
+            "input_type": input_data.get("type", "unknown")
+        }
+        return _LANGFUSE_EXECUTOR.submit(self._create_trace, user_id, metadata)
+
+    def _create_trace(self, user_id: str, metadata: Dict[str, Any]):
+        try:
+            return self.langfuse.trace(
+                name="langgraph-agent-processing",
+                user_id=user_id,
+                metadata=metadata
+            )
+        except Exception as e:
+            logger.warning("Failed to create Langfuse trace: %s", e)
+            return None
+
+    def _start_span(self, trace, initial_state: Dict[str, Any]):
+        """Add a Langfuse span for graph execution once the trace exists; returns a future, or None without tracing"""
+        if not trace:
+            return None
+        return _LANGFUSE_EXECUTOR.submit(_create_span, trace, name="langgraph-execution", input=initial_state)
+
+    def _end_span(self, span, result: Dict[str, Any]):
+        """Update the Langfuse span with the graph output in the background, if tracing"""
+        if not span:
+            return
+        _LANGFUSE_EXECUTOR.submit(
+            _update_span,
+            span,
+            output=result.get("content", {}),
+            metadata={
+                "execution_success": True,
+                "agent_name": self.name
+            }
+        )
+
+    def _record(self, user_id: str, input_json: str, content: Any, fallback: bool = False):
+        """Queue a processed input for memory, without waiting for the Mem0 write"""
+        if self.memory_client:
+            how = " with fallback" if fallback else ""
+            # The user's cached searches are invalidated once the write lands, not when it's queued;
+            # otherwise a search in between would cache pre-write results under the new generation
+            MEMORY_WRITER.add(self.memory_client, user_id, f"Agent {self.name} processed: {input_json}{how} and responded: {content}",
+                              on_written=functools.partial(self._bump_memory_generation, user_id))
+
+    def _success(self, content: Any, fallback: bool = False) -> Dict[str, Any]:
+        response = {
+            "content": content,
+            "agent": self.name,
+            "capabilities": self.capabilities
+        }
+        if fallback:
+            response["fallback_used"] = True
+        return response
+
+    def _failure(self, error_msg: str) -> Dict[str, Any]:
+        return {
+            "error": error_msg,
+            "agent": self.name,
+            "capabilities": self.capabilities
+        }
+    
+    def _result_key(self, user_id: str, input_json: str):
+        return (user_id, hashlib.blake2b(input_json.encode(), digest_size=16).hexdigest())
+
+    def _cached_result(self, key):
+        """Return a copy of the cached result for key, or None on a miss or with caching off"""
+        if key is None:
+            return None
+        cached = self._result_cache.get(key)
+        if cached is _MISS:
+            return None
+        return {**cached, "cached": True}
+
+    def _cache_result(self, key, response):
+        # Errors are never cached, so the next call retries
+        if key is not None and "error" not in response:
+            self._result_cache.set(key, dict(response))
+        return response
+    
+    def process_input(self, input_data: Dict[str, Any], user_id: str = "default_user",
+                      cache: bool = True) -> Dict[str, Any]:
+        """Process input using the LangGraph framework
+
+        An input identical to one this agent processed for the same user in the last five minutes
+        is answered from a cache, without searching memory or calling the model; pass cache=False
+        to always run the graph.
+        """
+        input_json = _input_json(input_data)
+        key = self._result_key(user_id, input_json) if cache else None
+        cached = self._cached_result(key)
+        if cached is not None:
+            return cached
+        return self._cache_result(key, self._process(input_data, input_json, user_id))
+
+    async def aprocess_input(self, input_data: Dict[str, Any], user_id: str = "default_user",
+                             cache: bool = True) -> Dict[str, Any]:
+        """Async variant of process_input, so many inputs can wait on the LLM concurrently"""
+        input_json = _input_json(input_data)
+        key = self._result_key(user_id, input_json) if cache else None
+        cached = self._cached_result(key)
+        if cached is not None:
+            return cached
+        return self._cache_result(key, await self._aprocess(input_data, input_json, user_id))
+
+    # Pipelines process_input tries in order, with the failure label for the simple pipeline's
+    # analysis; the next one only runs when the previous one tripped content moderation.
+    # Names are of the sync methods; the async path uses their _a-prefixed variants.
+    _PIPELINES = (
+        ("_graph_pipeline", None),
+        ("_simple_pipeline", "Analysis with simplified prompt failed")
+    )
+    # Without LangGraph
+    _NO_GRAPH_PIPELINES = (
+        ("_simple_pipeline", "Analysis failed"),
+    )
+
+    def _graph_pipeline(self, input_data: Dict[str, Any], input_json: str, user_id: str,
+                        trace, failure_label=None) -> Any:
+        """Run the LangGraph graph and return its content"""
+        # Initialize the state
+        initial_state = {
+            "input_data": input_data,
+            "input_json": input_json,
+            "user_id": user_id
+        }
+        span = self._start_span(trace, initial_state)
+        
+        # Run the graph
+        result = self.app.invoke(initial_state, config={"configurable": {"agent": self}})
+        
+        self._end_span(span, result)
+        return result.get("content", {})
+
+    async def _agraph_pipeline(self, input_data: Dict[str, Any], input_json: str, user_id: str,
+                               trace, failure_label=None) -> Any:
+        """Async variant of _graph_pipeline"""
+        initial_state = {
+            "input_data": input_data,
+            "input_json": input_json,
+            "user_id": user_id
+        }
+        span = self._start_span(trace, initial_state)
+        result = await self.app.ainvoke(initial_state, config={"configurable": {"agent": self}})
+        self._end_span(span, result)
+        return result.get("content", {})
+
+    def _pipelines(self):
+        return self._PIPELINES if self.app else self._NO_GRAPH_PIPELINES
+
+    def _finish(self, user_id: str, input_json: str, content: Any, attempt: int) -> Dict[str, Any]:
+        fallback = attempt > 0
+        self._record(user_id, input_json, content, fallback=fallback)
+        return self._success(content, fallback=fallback)
+
+    def _pipelines_failed(self, errors: List[Exception]) -> Dict[str, Any]:
+        if len(errors) == 1:
+            return self._failure(f"Error processing input: {str(errors[0])}")
+        return self._failure(
+            f"Error processing input (fallback also failed): {str(errors[0])} | Fallback error: {str(errors[-1])}"
+        )
+
+    def _process(self, input_data: Dict[str, Any], input_json: str, user_id: str) -> Dict[str, Any]:
+        # Start Langfuse trace if available
+        trace = self._start_trace(input_data, user_id)
+        errors = []
+        for attempt, (pipeline, failure_label) in enumerate(self._pipelines()):
+            try:
+                content = getattr(self, pipeline)(input_data, input_json, user_id, trace, failure_label)
+            except Exception as e:
+                errors.append(e)
+                if _is_moderation_error(e):
+                    continue
+                break
+            return self._finish(user_id, input_json, content, attempt)
+        return self._pipelines_failed(errors)
+
+    async def _aprocess(self, input_data: Dict[str, Any], input_json: str, user_id: str) -> Dict[str, Any]:
+        trace = self._start_trace(input_data, user_id)
+        errors = []
+        for attempt, (pipeline, failure_label) in enumerate(self._pipelines()):
+            try:
+                content = await getattr(self, "_a" + pipeline[1:])(input_data, input_json, user_id, trace, failure_label)
+            except Exception as e:
+                errors.append(e)
+                if _is_moderation_error(e):
+                    continue
+                break
+            return self._finish(user_id, input_json, content, attempt)
+        return self._pipelines_failed(errors)
+
+    async def process_batch(self, inputs: List[Tuple[Dict[str, Any], str]]) -> List[Dict[str, Any]]:
+        """Process several (input_data, user_id) pairs concurrently; results are in input order"""
+        return await asyncio.gather(*(self.aprocess_input(input_data, user_id) for input_data, user_id in inputs))
+
+    async def aprocess_input_stream(self, input_data: Dict[str, Any],
+                                    user_id: str = "default_user") -> AsyncIterator[Tuple[str, str]]:
+        """Yield the analysis and then the recommendations as they are generated, as (section, text) pairs
+
+        Uses the graph's prompts, with the memory search overlapping the analysis. Without a model
+        the result of aprocess_input is yielded one section at a time. Errors are yielded as a final
+        ("error", message) pair.
+        """
+        if not self.model:
+            result = await self.aprocess_input(input_data, user_id)
+            if "error" in result:
+                yield "error", result["error"]
+                return
+            yield "analysis", result["content"]["analysis"]
+            yield "recommendations", "\n".join(result["content"]["recommendations"])
+            return
+
+        input_json = _input_json(input_data)
+        memories = asyncio.create_task(self._asearch_memory_context(user_id, input_json))
+        content = self._default_analysis(input_data)
+        try:
+            parts = []
+            async for chunk in self.model.astream(_ANALYZE_PROMPT.format(input=input_json)):
+                if chunk.content:
+                    parts.append(chunk.content)
+                    yield "analysis", chunk.content
+            content["analysis"] = "".join(parts)
+            
+            parts = []
+            prompt = _RECOMMEND_PROMPT.format(analysis=content["analysis"], memories=await memories)
+            async for chunk in self.model.astream(prompt):
+                if chunk.content:
+                    parts.append(chunk.content)
+                    yield "recommendations", chunk.content
+            content["recommendations"] = ["".join(parts)]
+        except Exception as e:
+            memories.cancel()
+            yield "error", f"Error processing input: {str(e)}"
+            return
+        
+        # Record the streamed result the same way as a non-streamed one
+        self._record(user_id, input_json, content)
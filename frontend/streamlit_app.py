@@ -1,64 +1,247 @@
 import streamlit as st
-import json
+import functools
+import pandas as pd
 import sys
 import os
+from typing import TYPE_CHECKING
 
-# Add the parent directory to the path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if TYPE_CHECKING:
+    from orchestration.a2a_orchestrator import A2AOrchestrator
 
-from orchestration.a2a_orchestrator import A2AOrchestrator
+# Initialize one orchestrator per user; the agent frameworks are expensive to build, so they
+# are only imported and set up the first time a task actually runs. At most 8 users keep an
+# orchestrator, each for up to an hour, since the agents accumulate state
+@st.cache_resource(show_spinner=False, max_entries=8, ttl=3600)
+def get_orchestrator(user_id: str) -> "A2AOrchestrator":
+    # `streamlit run` only puts frontend/ on the path; the orchestration package is one level up
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if project_root not in sys.path:
+        sys.path.append(project_root)
+    from orchestration.a2a_orchestrator import A2AOrchestrator
+    return A2AOrchestrator(user_id=user_id)
 
-# Initialize the orchestrator
-@st.cache_resource
-def get_orchestrator():
-    return A2AOrchestrator(user_id=st.session_state.get("user_id", "default_user"))
+# Status line for each of the orchestrator's agents, with the framework it runs on
+_AGENT_LABEL_MD = {
+    name: f"- **{name.capitalize()}** ✅ Active ({framework})"
+    for name, framework in {
+        "researcher": "CrewAI Framework",
+        "analyzer": "LangGraph Framework",
+        "expert": "Google ADK Framework"
+    }.items()
+}
 
+# Conversation history kept per session, and the part of it collaborative tasks see
+MAX_HISTORY = 50
+COLLABORATIVE_HISTORY_WINDOW = 10
+
+# Formatting is pure, so reruns triggered by unrelated widgets reuse the rendered markdown;
+# st.cache_data keys each call on a hash of the (nested) result dict
+FORMAT_CACHE_TTL = 24 * 60 * 60
+
+# Known text fields of a result's content dict, most specific first
+_CONTENT_FORMATS = (
+    (("title", "summary"), lambda content: f"**{content['title']}**\n\n{content['summary']}"),
+    (("summary",), lambda content: content["summary"]),
+    (("answer",), lambda content: content["answer"]),
+    (("response",), lambda content: content["response"])
+)
+
+@st.cache_data(ttl=FORMAT_CACHE_TTL, show_spinner=False)
 def format_agent_output(result_data):
-    """Format agent output for better presentation"""
-    if isinstance(result_data, dict):
-        if "content" in result_data:
-            content = result_data["content"]
-            if isinstance(content, dict):
-                return format_dict_content(content)
-            else:
-                return str(content)
-        elif "response" in result_data:
-            return str(result_data["response"])
-        else:
-            return json.dumps(result_data, indent=2)
-    else:
+    """Format agent output for better presentation.
+
+    Returns markdown, or the dict itself when it has no text to show; write_blocks renders
+    those with st.json.
+    """
+    if not isinstance(result_data, dict):
         return str(result_data)
+    if "content" not in result_data:
+        return str(result_data["response"]) if "response" in result_data else result_data
 
-def format_dict_content(content_dict):
-    """Format dictionary content for better presentation"""
-    if isinstance(content_dict, dict):
-        # Check for common response formats
-        if "summary" in content_dict:
-            return content_dict["summary"]
-        elif "answer" in content_dict:
-            return content_dict["answer"]
-        elif "response" in content_dict:
-            return content_dict["response"]
-        elif "title" in content_dict and "summary" in content_dict:
-            return f"**{content_dict['title']}**\n\n{content_dict['summary']}"
-        else:
-            # Format as key-value pairs for readability
-            formatted = ""
-            for key, value in content_dict.items():
-                formatted += f"**{key.replace('_', ' ').title()}:** {value}\n\n"
-            return formatted
-    return str(content_dict)
+    content = result_data["content"]
+    if not isinstance(content, dict):
+        return str(content)
+    for keys, format_content in _CONTENT_FORMATS:
+        if all(key in content for key in keys):
+            return format_content(content)
+    # Format as key-value pairs for readability
+    return "".join(f"**{_pretty(key)}:** {value}\n\n" for key, value in content.items())
 
+@functools.lru_cache(maxsize=256)
+def _pretty(key: str) -> str:
+    # Result and task dicts reuse a small set of keys, so each is titled once
+    return key.replace('_', ' ').title()
+
+# Internal task parameters left out of the task summary
+_SKIP_TASK_KEYS = frozenset({"auto_api_selection"})
+
+@st.cache_data(ttl=FORMAT_CACHE_TTL, show_spinner=False)
 def format_task_output(task_data):
     """Format task data for better presentation"""
     if isinstance(task_data, dict):
-        formatted = ""
-        for key, value in task_data.items():
-            if key not in ["auto_api_selection"]:  # Skip internal parameters
-                formatted += f"**{key.replace('_', ' ').title()}:** {value}\n\n"
-        return formatted
+        return "".join(
+            f"**{_pretty(key)}:** {value}\n\n"
+            for key, value in task_data.items()
+            if key not in _SKIP_TASK_KEYS
+        )
     return str(task_data)
 
+def add_to_history(*entries):
+    """Append entries to the conversation history, keeping only the last MAX_HISTORY"""
+    history = st.session_state.conversation_history
+    history.extend(entries)
+    del history[:-MAX_HISTORY]
+
+def write_blocks(parts):
+    """Write markdown parts as one element; dict parts in between are rendered by st.json, collapsed"""
+    run = []
+    for part in parts:
+        if isinstance(part, str):
+            run.append(part)
+            continue
+        if run:
+            st.markdown("\n\n".join(run))
+            run = []
+        st.json(part, expanded=False)
+    if run:
+        st.markdown("\n\n".join(run))
+
+def write_stream(chunks):
+    """Write an orchestrator stream's {"delta": text} chunks as they arrive and return its result"""
+    final = {}
+
+    def deltas():
+        for chunk in chunks:
+            if "delta" in chunk:
+                yield chunk["delta"]
+            else:
+                final.update(chunk)
+
+    st.write_stream(deltas())
+    return final["result"]
+
+@st.fragment
+def render_status_panel():
+    """Render the agent status and conversation history column.
+
+    Running as a fragment, it can rerun on its own without re-executing the sidebar, the
+    framework notes and the task form; session_state is shared with the full script.
+    """
+    st.header("Agent Status")
+    
+    # Display agent statuses with framework information
+    st.subheader("Active Agents")
+    for label in _AGENT_LABEL_MD.values():
+        st.markdown(label)
+    
+    # Display conversation history
+    st.subheader("Conversation History")
+    history = st.session_state.conversation_history
+    if history:
+        for i, entry in enumerate(reversed(history[-5:])):
+            with st.expander(f"Task {len(history)-i}", expanded=False):
+                raw = entry["result"]
+                wrapped = isinstance(raw, dict) and "result" in raw
+                result_data = raw["result"] if wrapped else raw
+                
+                # Consecutive markdown parts go out as a single element
+                parts = ["**Task:**", format_task_output(entry["task"]), "**Result:**", format_agent_output(result_data)]
+                
+                # APIs used and token usage are only reported by routed agent results
+                rd_dict = result_data if wrapped and isinstance(result_data, dict) else None
+                
+                # Display APIs used if available
+                apis_used = rd_dict and rd_dict.get("apis_used")
+                if apis_used:
+                    parts += ["**APIs Used:**", ", ".join(apis_used)]
+                
+                # Display token usage if available
+                token_usage = rd_dict and rd_dict.get("token_usage")
+                if token_usage:
+                    parts += ["**Token Usage:**", token_usage]
+                write_blocks(parts)
+
+    else:
+        st.info("No tasks executed yet.")
+
+@st.fragment
+def render_sidebar() -> dict:
+    """Render the sidebar widgets and return their values.
+
+    As a fragment, sidebar interactions only rerun the sidebar. Changing the user or the agent
+    type reshapes the main column, so those two still trigger a full rerun.
+    """
+    # User ID input
+    st.header("User Configuration")
+    user_id = st.text_input("User ID", st.session_state.user_id)
+    st.session_state.user_id = user_id
+    
+    # Sidebar for agent selection
+    st.header("Agent Configuration")
+    agent_type = st.selectbox(
+        "Select Agent Type",
+        ["Auto-route", "Research Agent", "Analysis Agent", "Expert Agent", "Collaborative Execution"]
+    )
+    
+    layout = (user_id, agent_type)
+    if st.session_state.setdefault("sidebar_layout", layout) != layout:
+        st.session_state.sidebar_layout = layout
+        st.rerun()
+    
+    # API Selection Mode (only for individual agents)
+    auto_selection = True
+    if agent_type != "Collaborative Execution":
+        st.subheader("API Selection Mode")
+        auto_api_selection = st.radio(
+            "API Selection Method",
+            ["Automatic (Smart Detection)", "Manual (User Control)"],
+            index=0  # Default to automatic
+        )
+        
+        auto_selection = (auto_api_selection == "Automatic (Smart Detection)")
+    
+    # External API options for Research Agent (only shown in manual mode)
+    api_options = {
+        "use_web_search": False,
+        "use_news": False,
+        "use_weather": False,
+        "city": None,
+        "use_geolocation": False,
+        "ip_address": None,
+        "use_stock_data": False,
+        "stock_symbol": None,
+        "use_wikipedia": False,
+        "wikipedia_query": None
+    }
+    
+    if agent_type == "Research Agent" and not auto_selection:
+        st.subheader("External API Options")
+        api_options["use_web_search"] = st.checkbox("Use Tavily Search")
+        api_options["use_news"] = st.checkbox("Get Latest News")
+        api_options["use_weather"] = st.checkbox("Get Weather Data")
+        api_options["use_geolocation"] = st.checkbox("Get Geolocation")
+        api_options["use_stock_data"] = st.checkbox("Get Stock Data")
+        api_options["use_wikipedia"] = st.checkbox("Search Wikipedia")
+        
+        if api_options["use_weather"]:
+            api_options["city"] = st.text_input("City for Weather", "New York")
+            
+        if api_options["use_geolocation"]:
+            api_options["ip_address"] = st.text_input("IP Address for Geolocation", "")
+            
+        if api_options["use_stock_data"]:
+            api_options["stock_symbol"] = st.text_input("Stock Symbol", "AAPL")
+            
+        if api_options["use_wikipedia"]:
+            api_options["wikipedia_query"] = st.text_input("Wikipedia Search Query", "Artificial Intelligence")
+    
+    return {
+        "user_id": user_id,
+        "agent_type": agent_type,
+        "auto_selection": auto_selection,
+        "api_options": api_options
+    }
+
 def main():
     st.set_page_config(page_title="Multi-Agent System", page_icon="🤖", layout="wide")
     
@@ -88,72 +271,18 @@ def main():
         """)
     
     # Initialize session state
-    if "orchestrator" not in st.session_state:
-        st.session_state.orchestrator = get_orchestrator()
-    
     if "conversation_history" not in st.session_state:
         st.session_state.conversation_history = []
     
     if "user_id" not in st.session_state:
         st.session_state.user_id = "default_user"
     
-    # User ID input
-    st.sidebar.header("User Configuration")
-    user_id = st.sidebar.text_input("User ID", st.session_state.user_id)
-    st.session_state.user_id = user_id
-    st.session_state.orchestrator.user_id = user_id
+    # History is only ever changed in place (see add_to_history), so this stays current
+    history = st.session_state.conversation_history
     
-    # Sidebar for agent selection
-    st.sidebar.header("Agent Configuration")
-    agent_type = st.sidebar.selectbox(
-        "Select Agent Type",
-        ["Auto-route", "Research Agent", "Analysis Agent", "Expert Agent", "Collaborative Execution"]
-    )
-    
-    # API Selection Mode (only for individual agents)
-    auto_selection = True
-    if agent_type != "Collaborative Execution":
-        st.sidebar.subheader("API Selection Mode")
-        auto_api_selection = st.sidebar.radio(
-            "API Selection Method",
-            ["Automatic (Smart Detection)", "Manual (User Control)"],
-            index=0  # Default to automatic
-        )
-        
-        auto_selection = (auto_api_selection == "Automatic (Smart Detection)")
-    
-    # External API options for Research Agent (only shown in manual mode)
-    use_web_search = False
-    use_news = False
-    use_weather = False
-    use_geolocation = False
-    use_stock_data = False
-    use_wikipedia = False
-    city = None
-    ip_address = None
-    stock_symbol = None
-    wikipedia_query = None
-    
-    if agent_type == "Research Agent" and not auto_selection:
-        st.sidebar.subheader("External API Options")
-        use_web_search = st.sidebar.checkbox("Use Tavily Search")
-        use_news = st.sidebar.checkbox("Get Latest News")
-        use_weather = st.sidebar.checkbox("Get Weather Data")
-        use_geolocation = st.sidebar.checkbox("Get Geolocation")
-        use_stock_data = st.sidebar.checkbox("Get Stock Data")
-        use_wikipedia = st.sidebar.checkbox("Search Wikipedia")
-        
-        if use_weather:
-            city = st.sidebar.text_input("City for Weather", "New York")
-            
-        if use_geolocation:
-            ip_address = st.sidebar.text_input("IP Address for Geolocation", "")
-            
-        if use_stock_data:
-            stock_symbol = st.sidebar.text_input("Stock Symbol", "AAPL")
-            
-        if use_wikipedia:
-            wikipedia_query = st.sidebar.text_input("Wikipedia Search Query", "Artificial Intelligence")
+    with st.sidebar:
+        sidebar = render_sidebar()
+    agent_type = sidebar["agent_type"]
     
     # Main content area
     col1, col2 = st.columns([2, 1])
@@ -172,15 +301,15 @@ def main():
         task_params = {}
         if agent_type == "Analysis Agent":
             st.subheader("Analysis Data")
-            data_input = st.text_area(
-                "Enter data for analysis (comma-separated):",
-                placeholder="Example: 10, 20, 30, 40, 50"
+            # The editor only accepts numbers, so the column arrives already typed as float64
+            data_frame = st.data_editor(
+                pd.DataFrame({"value": pd.Series([], dtype="float64")}),
+                num_rows="dynamic",
+                key="analysis_data"
             )
-            if data_input:
-                try:
-                    task_params["data"] = [float(x.strip()) for x in data_input.split(",")]
-                except:
-                    st.warning("Could not parse data. Please enter comma-separated numbers.")
+            values = data_frame["value"].dropna()
+            if len(values):
+                task_params["data"] = values.to_numpy()
         
         elif agent_type == "Expert Agent":
             st.subheader("Additional Context")
@@ -194,24 +323,23 @@ def main():
         # Submit button
         if st.button("Submit Task", type="primary"):
             if task_input:
+                orchestrator = get_orchestrator(sidebar["user_id"])
                 if agent_type == "Collaborative Execution":
                     # Execute collaborative task
                     with st.spinner("Agents working together..."):
-                        result = st.session_state.orchestrator.collaborative_task_execution(
+                        # Research and analysis run first; the expert's recommendation streams in
+                        st.subheader("Final Expert Recommendation")
+                        # Only the most recent turns are handed to the agents
+                        window = history[-COLLABORATIVE_HISTORY_WINDOW:]
+                        result = write_stream(orchestrator.collaborative_task_execution_stream(
                             task_input, 
-                            st.session_state.conversation_history
-                        )
-                        
-                        # Update conversation history
-                        st.session_state.conversation_history = result["conversation_history"]
+                            window
+                        ))
                         
-                        # Show final output
                         st.success("Collaborative task completed!")
-                        st.subheader("Final Expert Recommendation")
-                        st.markdown(format_agent_output(result["final_output"]))
                         
-                        # Add to conversation history
-                        st.session_state.conversation_history.append({
+                        # Add the agents' turns and the final output to conversation history
+                        add_to_history(*result["new_turns"], {
                             "task": {"type": "collaborative", "content": task_input},
                             "result": {"final_output": result["final_output"]}
                         })
@@ -222,19 +350,10 @@ def main():
                     if agent_type == "Research Agent":
                         task["type"] = "research"
                         # Add API selection mode
-                        task["auto_api_selection"] = auto_selection
-                        if not auto_selection:
+                        task["auto_api_selection"] = sidebar["auto_selection"]
+                        if not sidebar["auto_selection"]:
                             # Add external API parameters for manual mode
-                            task["use_web_search"] = use_web_search
-                            task["use_news"] = use_news
-                            task["use_weather"] = use_weather
-                            task["city"] = city
-                            task["use_geolocation"] = use_geolocation
-                            task["ip_address"] = ip_address
-                            task["use_stock_data"] = use_stock_data
-                            task["stock_symbol"] = stock_symbol
-                            task["use_wikipedia"] = use_wikipedia
-                            task["wikipedia_query"] = wikipedia_query
+                            task.update(sidebar["api_options"])
                     elif agent_type == "Analysis Agent":
                         task["type"] = "analysis"
                         task.update(task_params)
@@ -246,10 +365,10 @@ def main():
                     
                     # Execute task
                     with st.spinner("Processing your task..."):
-                        result = st.session_state.orchestrator.route_task(task)
+                        result = write_stream(orchestrator.route_task_stream(task))
                     
                     # Add to conversation history
-                    st.session_state.conversation_history.append({
+                    add_to_history({
                         "task": task,
                         "result": result
                     })
@@ -259,55 +378,7 @@ def main():
                 st.warning("Please enter a task.")
     
     with col2:
-        st.header("Agent Status")
-        
-        # Display agent statuses with framework information
-        st.subheader("Active Agents")
-        agent_frameworks = {
-            "researcher": "CrewAI Framework",
-            "analyzer": "LangGraph Framework",
-            "expert": "Google ADK Framework"
-        }
-        
-        for agent_name in st.session_state.orchestrator.agents.keys():
-            framework = agent_frameworks.get(agent_name, "Framework")
-            st.markdown(f"- **{agent_name.capitalize()}** ✅ Active ({framework})")
-        
-        # Display conversation history
-        st.subheader("Conversation History")
-        if st.session_state.conversation_history:
-            for i, entry in enumerate(reversed(st.session_state.conversation_history[-5:])):
-                with st.expander(f"Task {len(st.session_state.conversation_history)-i}", expanded=False):
-                    st.markdown("**Task:**")
-                    st.markdown(format_task_output(entry["task"]))
-                    
-                    st.markdown("**Result:**")
-                    if isinstance(entry["result"], dict) and "result" in entry["result"]:
-                        result_data = entry["result"]["result"]
-                        st.markdown(format_agent_output(result_data))
-                    else:
-                        st.markdown(format_agent_output(entry["result"]))
-                    
-                    # Display APIs used if available
-                    if isinstance(entry["result"], dict) and "result" in entry["result"]:
-                        result_data = entry["result"]["result"]
-                        if isinstance(result_data, dict) and "apis_used" in result_data:
-                            apis_used = result_data["apis_used"]
-                            if apis_used:
-                                st.markdown("**APIs Used:**")
-                                st.markdown(", ".join(apis_used))
-                    
-                    # Display token usage if available
-                    if isinstance(entry["result"], dict) and "result" in entry["result"]:
-                        result_data = entry["result"]["result"]
-                        if isinstance(result_data, dict) and "token_usage" in result_data:
-                            token_usage = result_data["token_usage"]
-                            if token_usage:
-                                st.markdown("**Token Usage:**")
-                                st.json(token_usage)
-
-        else:
-            st.info("No tasks executed yet.")
+        render_status_panel()
     
     # Run coordinated tasks section
     st.divider()
@@ -334,42 +405,31 @@ def main():
                 }
             ]
             
-            # Execute coordinated tasks
-            results = st.session_state.orchestrator.coordinate_agents(tasks)
-            
-            # Display results
+            # Execute coordinated tasks; research and analysis run concurrently, and each result
+            # is displayed as soon as its agent finishes
             st.subheader("Coordinated Task Results")
-            for i, result in enumerate(results):
-                st.markdown(f"**Task {i+1} ({result['agent'].capitalize()}):**")
-                
-                if isinstance(result["result"], dict) and "content" in result["result"]:
-                    st.markdown(format_agent_output(result["result"]))
-                else:
-                    st.markdown(format_agent_output(result["result"]))
+            results = [None] * len(tasks)
+            for i, result in get_orchestrator(sidebar["user_id"]).coordinate_agents_iter(tasks):
+                results[i] = result
+                result_data = result["result"]
+                parts = [f"**Task {i+1} ({result['agent'].capitalize()}):**", format_agent_output(result_data)]
+                rd_dict = result_data if isinstance(result_data, dict) else None
                 
                 # Display APIs used if available
-                if isinstance(result["result"], dict) and "apis_used" in result["result"]:
-                    apis_used = result["result"]["apis_used"]
-                    if apis_used:
-                        st.markdown("**APIs Used:**")
-                        st.markdown(", ".join(apis_used))
+                apis_used = rd_dict and rd_dict.get("apis_used")
+                if apis_used:
+                    parts += ["**APIs Used:**", ", ".join(apis_used)]
                 
                 # Display token usage if available
-                if isinstance(result["result"], dict) and "token_usage" in result["result"]:
-                    token_usage = result["result"]["token_usage"]
-                    if token_usage:
-                        st.markdown("**Token Usage:**")
-                        tokens_used = token_usage.get("total_tokens", 0)
-                        st.markdown(f"Total Tokens: {tokens_used}")
+                token_usage = rd_dict and rd_dict.get("token_usage")
+                if token_usage:
+                    parts += ["**Token Usage:**", f"Total Tokens: {token_usage.get('total_tokens', 0)}"]
                 
+                write_blocks(parts)
                 st.divider()
             
             # Add to conversation history
-            for i, (task, result) in enumerate(zip(tasks, results)):
-                st.session_state.conversation_history.append({
-                    "task": task,
-                    "result": result
-                })
+            add_to_history(*({"task": task, "result": result} for task, result in zip(tasks, results)))
             
             st.success("Coordinated tasks completed!")
 
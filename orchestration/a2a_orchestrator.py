@@ -1,11 +1,126 @@
 import json
 import time
+import asyncio
 import uuid
+import threading
+import itertools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
 import os
-from typing import Dict, Any, List, Optional
-from agents.crewai_agent import RealCrewAIAgent
-from agents.langgraph_agent import RealLangGraphAgent
-from agents.google_adk_agent import RealGoogleADKAgent
+import functools
+import tempfile
+from pathlib import Path
+from urllib.parse import urlparse, unquote
+import hashlib
+from contextlib import contextmanager, asynccontextmanager
+from typing import Dict, Any, List, Optional, Iterator, AsyncIterator, Tuple
+from agents.external_apis import _TTLCache, _MISS
+from agents._shared import get_langfuse as _get_langfuse, json_default as _json_default
+
+# redis is optional; without it tasks only live in this process
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# orjson is optional; task records are re-encoded on every status, history and artifact update
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Research options a manual-selection task may set, with their defaults
+_MANUAL_API_OPTIONS = (
+    ("use_web_search", False),
+    ("use_news", False),
+    ("use_weather", False),
+    ("use_geolocation", False),
+    ("use_stock_data", False),
+    ("use_wikipedia", False),
+    ("city", None),
+    ("ip_address", None),
+    ("stock_symbol", None),
+    ("wikipedia_query", None)
+)
+
+# How long a task's record is kept in Redis after its last update
+TASK_TTL_SECONDS = 24 * 60 * 60
+
+@functools.lru_cache(maxsize=1)
+def _get_redis():
+    """Shared Redis client for task records, or None when REDIS_URL is unset or redis is missing"""
+    redis_url = os.getenv("REDIS_URL")
+    if not redis_url or not redis:
+        return None
+    try:
+        return redis.Redis.from_url(redis_url, decode_responses=True)
+    except Exception as e:
+        print(f"Warning: Redis initialization failed: {e}")
+        return None
+
+def _dumps(obj) -> str:
+    """Encode a task record field as JSON"""
+    if orjson:
+        return orjson.dumps(obj, default=_json_default,
+                            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode()
+    return json.dumps(obj, default=_json_default)
+
+def _loads(raw):
+    """Decode a task record field"""
+    return orjson.loads(raw) if orjson else json.loads(raw)
+
+def _copy_route(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a routed result, so callers can't change what the route cache hands out next"""
+    inner = result["result"]
+    return {**result, "result": dict(inner) if isinstance(inner, dict) else inner}
+
+def _task_cache_key(task: Dict[str, Any]) -> str:
+    """Stable key for a task's contents: a 128-bit BLAKE2b digest of its canonical JSON"""
+    payload = json.dumps(task, sort_keys=True, default=_json_default).encode()
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+# (second, ISO timestamp) of the last formatted time; timestamps only have second resolution,
+# so bursts of status and history updates reuse the string
+_LAST_TIMESTAMP = (0, "")
+
+def _now_iso() -> str:
+    """Current UTC time as an ISO 8601 string, e.g. 2024-01-01T12:00:00Z"""
+    global _LAST_TIMESTAMP
+    now = int(time.time())
+    second, formatted = _LAST_TIMESTAMP
+    if now != second:
+        formatted = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now))
+        _LAST_TIMESTAMP = (now, formatted)
+    return formatted
+
+def _result_content(result: Any) -> Any:
+    """The content of an agent result, or a description of its error"""
+    if not isinstance(result, dict):
+        return str(result)
+    if "content" in result:
+        return result["content"]
+    if "error" in result:
+        return f"Error occurred: {result['error']}"
+    return str(result)
+
+def _iterate(agen: AsyncIterator) -> Iterator:
+    """Iterate an async generator from sync code, on a private event loop"""
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(agen.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        loop.run_until_complete(agen.aclose())
+        # Lets per-loop resources, like the agents' async HTTP clients, close themselves
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+# Async callers wait for an agent's concurrency slot here rather than in the event loop's default
+# executor, which the calls already holding slots need for their own to_thread work
+_SLOT_WAIT_EXECUTOR = ThreadPoolExecutor(max_workers=16, thread_name_prefix="a2a-slot-wait")
 
 # Task state enumeration
 class TaskState:
@@ -17,13 +132,36 @@ class TaskState:
     FAILED = "failed"
     UNKNOWN = "unknown"
 
+# States of tasks that are still in progress; those are never evicted
+_ACTIVE_STATES = frozenset({TaskState.SUBMITTED, TaskState.WORKING, TaskState.INPUT_REQUIRED})
+
+# Allowed (from, to) status transitions; completed, canceled and failed tasks are final
+_TRANSITIONS = frozenset({
+    (TaskState.SUBMITTED, TaskState.WORKING),
+    (TaskState.SUBMITTED, TaskState.CANCELED),
+    (TaskState.SUBMITTED, TaskState.FAILED),
+    (TaskState.WORKING, TaskState.WORKING),
+    (TaskState.WORKING, TaskState.INPUT_REQUIRED),
+    (TaskState.WORKING, TaskState.COMPLETED),
+    (TaskState.WORKING, TaskState.CANCELED),
+    (TaskState.WORKING, TaskState.FAILED),
+    (TaskState.INPUT_REQUIRED, TaskState.WORKING),
+    (TaskState.INPUT_REQUIRED, TaskState.CANCELED),
+    (TaskState.INPUT_REQUIRED, TaskState.FAILED),
+})
+
 class TaskStatus:
+    __slots__ = ("state", "message", "timestamp")
+
     def __init__(self, state: str, message: str = "", timestamp: Optional[str] = None):
         self.state = state
         self.message = message
-        self.timestamp = timestamp or time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        self.timestamp = timestamp or _now_iso()
 
 class Task:
+    # Slots keep long-lived task stores small: no per-instance __dict__
+    __slots__ = ("id", "session_id", "status", "history", "artifacts", "metadata", "message", "lock")
+
     def __init__(self, task_id: str, session_id: Optional[str] = None, message: str = ""):
         self.id = task_id
         self.session_id = session_id or str(uuid.uuid4())
@@ -32,170 +170,602 @@ class Task:
         self.artifacts: List[Dict] = []
         self.metadata: Dict[str, Any] = {}
         self.message = message
+        # Serializes updates to this task, so concurrent agents don't lose history or artifacts
+        self.lock = threading.Lock()
+
+def _status_record(status: TaskStatus) -> Dict[str, str]:
+    return {"state": status.state, "message": status.message, "timestamp": status.timestamp}
+
+def _field_record(task: Task, field: str):
+    """A task field as JSON data, as it is kept in the task's Redis record"""
+    return _status_record(task.status) if field == "status" else getattr(task, field)
+
+def _set_field(task: Task, field: str, value):
+    if field == "status":
+        task.status = TaskStatus(**value)
+    else:
+        setattr(task, field, value)
+
+# Artifact text longer than this is kept in the artifact store rather than in memory
+ARTIFACT_INLINE_LIMIT = 4096
+
+class ArtifactStore:
+    """Keeps large artifact contents as files, under A2A_ARTIFACT_DIR or the temp directory
+
+    Processes that share tasks, like the app and its queue workers, must share A2A_ARTIFACT_DIR
+    (e.g. a mounted volume); artifacts are found there by file name, wherever it is mounted.
+    A task's files are deleted with the task, and files older than max_age seconds, the life of
+    a task record in Redis, are swept up on later writes.
+    """
+    # Seconds between sweeps for expired artifacts
+    SWEEP_INTERVAL = 3600
+
+    def __init__(self, directory: Optional[str] = None, max_age: float = TASK_TTL_SECONDS):
+        self.directory = Path(directory or os.getenv("A2A_ARTIFACT_DIR") or Path(tempfile.gettempdir()) / "a2a-artifacts")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_age = max_age
+        self._next_sweep = 0.0
+
+    def write(self, task_id: str, content: str) -> str:
+        """Store content and return its URI"""
+        if time.monotonic() >= self._next_sweep:
+            self._next_sweep = time.monotonic() + self.SWEEP_INTERVAL
+            self.sweep()
+        path = self.directory / f"{task_id}-{uuid.uuid4().hex}.txt"
+        path.write_text(content, encoding="utf-8")
+        return path.as_uri()
+
+    def read(self, uri: str) -> str:
+        return (self.directory / Path(unquote(urlparse(uri).path)).name).read_text(encoding="utf-8")
+
+    def delete(self, task_id: str):
+        """Remove all of a task's artifact files"""
+        for path in self.directory.glob(f"{task_id}-*.txt"):
+            try:
+                path.unlink()
+            except OSError as e:
+                print(f"Warning: Failed to delete artifact {path.name}: {e}")
+
+    def sweep(self):
+        """Remove artifact files older than max_age"""
+        cutoff = time.time() - self.max_age
+        for path in self.directory.glob("*.txt"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except OSError:
+                # Removed by another process's sweep
+                pass
 
 class A2AOrchestrator:
-    def __init__(self, user_id: str = "default_user"):
+    # Finished tasks kept in memory, least recently used evicted first
+    MAX_TASKS = 10_000
+    # Calls each agent may have in flight at once, to stay within provider rate limits;
+    # override per agent with the agent_concurrency argument
+    AGENT_CONCURRENCY = {"researcher": 3, "analyzer": 8, "expert": 3}
+    # The agent each task type is routed to; anything else goes to the expert
+    _TASK_AGENTS = {"research": "researcher", "analysis": "analyzer"}
+
+    def __init__(self, user_id: str = "default_user", max_tasks: int = MAX_TASKS,
+                 agent_concurrency: Optional[Dict[str, int]] = None):
         self.user_id = user_id
-        # Initialize Langfuse for observability
-        try:
-            from langfuse import Langfuse
-            self.langfuse = Langfuse(
-                public_key=os.getenv("LANGFUSE_PUBLIC_KEY"),
-                secret_key=os.getenv("LANGFUSE_SECRET_KEY"),
-                host=os.getenv("LANGFUSE_HOST", "https://cloud.langfuse.com")
-            )
-        except ImportError:
-            self.langfuse = None
-        except Exception as e:
-            print(f"Warning: Langfuse initialization failed: {e}")
-            self.langfuse = None
+        # Langfuse for observability, shared with the agents
+        self.langfuse = _get_langfuse()
             
-        # Initialize all agents with actual frameworks
-        self.researcher = RealCrewAIAgent(
+        # The agents (researcher, analyzer, expert) are built on first use; their frameworks
+        # are slow to import, and a process may only ever route one kind of task.
+        # route_task's handler for each task type
+        self._handlers = {
+            "research": self._handle_research,
+            "analysis": self._handle_analysis,
+            "expert_query": self._handle_expert
+        }
+        
+        # Task management; with Redis configured, task records are also kept there so they
+        # survive restarts and can be updated by queue workers (see orchestration/tasks.py)
+        self.tasks: "OrderedDict[str, Task]" = OrderedDict()
+        self.max_tasks = max_tasks
+        self._tasks_lock = threading.Lock()
+        self.redis = _get_redis()
+        self.artifact_store = ArtifactStore()
+        
+        # Routed results by task contents, and the routes still running (see route_task)
+        self._route_cache = _TTLCache(1024, 3600)
+        self._inflight: Dict[str, Future] = {}
+        self._ainflight: Dict[tuple, asyncio.Future] = {}
+        self._inflight_lock = threading.Lock()
+        
+        # Caps on concurrent calls per agent, shared by the sync and async routes
+        limits = {**self.AGENT_CONCURRENCY, **(agent_concurrency or {})}
+        self._agent_slots = {agent: threading.BoundedSemaphore(limit) for agent, limit in limits.items()}
+        
+    @functools.cached_property
+    def researcher(self):
+        from agents.crewai_agent import RealCrewAIAgent
+        return RealCrewAIAgent(
             role="Research Analyst",
             goal="Analyze topics and provide comprehensive insights using actual CrewAI framework",
             backstory="You are an experienced analyst with expertise in research and analysis across multiple domains, utilizing the powerful CrewAI framework."
         )
-        
-        self.analyzer = RealLangGraphAgent(
+    
+    @functools.cached_property
+    def analyzer(self):
+        from agents.langgraph_agent import RealLangGraphAgent
+        return RealLangGraphAgent(
             name="Data Analyzer",
             capabilities=["data analysis", "pattern recognition", "insight generation", "statistical modeling"]
         )
-        
-        self.expert = RealGoogleADKAgent(
+    
+    @functools.cached_property
+    def expert(self):
+        from agents.google_adk_agent import RealGoogleADKAgent
+        return RealGoogleADKAgent(
             name="Domain Expert",
             expertise="technology trends, business strategy, and implementation best practices using Google ADK framework"
         )
-        
-        self.agents = {
+    
+    @property
+    def agents(self) -> Dict[str, Any]:
+        """All agents by name; builds any not yet in use"""
+        return {
             "researcher": self.researcher,
             "analyzer": self.analyzer,
             "expert": self.expert
         }
         
-        # Task management
-        self.tasks: Dict[str, Task] = {}
-        
     def create_task(self, message: str, session_id: Optional[str] = None) -> Task:
         """Create a new task with proper A2A task structure"""
         task_id = str(uuid.uuid4())
         task = Task(task_id, session_id, message)
-        self.tasks[task_id] = task
+        with self._tasks_lock:
+            self.tasks[task_id] = task
+            evicted = self._evict_tasks()
+        # With Redis, evicted tasks live on there, and their artifacts are swept when they expire
+        if not self.redis:
+            for evicted_id in evicted:
+                self.artifact_store.delete(evicted_id)
+        self._store_task(task)
         return task
+
+    def _evict_tasks(self) -> List[str]:
+        """Drop the least recently used finished tasks past max_tasks, returning their IDs; call
+        with _tasks_lock held"""
+        excess = len(self.tasks) - self.max_tasks
+        if excess <= 0:
+            return []
+        finished = (task_id for task_id, task in self.tasks.items() if task.status.state not in _ACTIVE_STATES)
+        evicted = list(itertools.islice(finished, excess))
+        for task_id in evicted:
+            del self.tasks[task_id]
+        return evicted
     
-    def update_task_status(self, task_id: str, state: str, message: str = ""):
-        """Update the status of a task"""
-        if task_id in self.tasks:
-            self.tasks[task_id].status = TaskStatus(state, message)
+    def update_task_status(self, task_id: str, state: str, message: str = "",
+                           expected_prev: Optional[str] = None) -> bool:
+        """
+        Move a task to a new state; returns False, leaving the task unchanged, if the task is
+        unknown, the transition is not allowed (see _TRANSITIONS), or the task is no longer in
+        expected_prev. Callers that raced another update can re-read the task and retry or give up.
+        With Redis, the check is made against the stored record, so it holds across processes.
+        """
+        task = self.get_task(task_id)
+        if not task:
+            return False
+        new_status = _status_record(TaskStatus(state, message))
+
+        def transition(status):
+            current = status["state"]
+            if expected_prev is not None and current != expected_prev:
+                return None
+            if (current, state) not in _TRANSITIONS:
+                return None
+            return new_status
+
+        with task.lock:
+            return self._update_field(task, "status", transition)
     
     def add_task_history(self, task_id: str, entry: Dict):
         """Add an entry to the task history"""
-        if task_id in self.tasks:
-            self.tasks[task_id].history.append(entry)
+        task = self.get_task(task_id)
+        if task:
+            def append(history):
+                history.append(entry)
+                return history
+            with task.lock:
+                self._update_field(task, "history", append)
     
     def add_task_artifact(self, task_id: str, artifact: Dict):
-        """Add an artifact to the task"""
-        if task_id in self.tasks:
-            artifact["index"] = len(self.tasks[task_id].artifacts)
-            self.tasks[task_id].artifacts.append(artifact)
+        """Add an artifact to the task; text content over ARTIFACT_INLINE_LIMIT characters is
+        written to the artifact store and replaced by a {"uri", "size"} reference (see load_artifact)"""
+        task = self.get_task(task_id)
+        if task:
+            artifact = dict(artifact)
+            content = artifact.get("content")
+            if isinstance(content, str) and len(content) > ARTIFACT_INLINE_LIMIT:
+                artifact["content"] = {"uri": self.artifact_store.write(task_id, content), "size": len(content)}
+
+            def append(artifacts):
+                artifacts.append({**artifact, "index": len(artifacts)})
+                return artifacts
+            with task.lock:
+                self._update_field(task, "artifacts", append)
     
+    def load_artifact(self, artifact: Dict) -> Any:
+        """An artifact's content, read back from the artifact store if it was written there"""
+        content = artifact.get("content")
+        if isinstance(content, dict) and "uri" in content:
+            return self.artifact_store.read(content["uri"])
+        return content
+
     def get_task(self, task_id: str) -> Optional[Task]:
-        """Get a task by ID"""
-        return self.tasks.get(task_id)
+        """Get a task by ID, reading it from Redis if it is not one of this process's tasks"""
+        with self._tasks_lock:
+            task = self.tasks.get(task_id)
+            if task is not None:
+                self.tasks.move_to_end(task_id)
+        if task is None:
+            task = self._load_task(task_id)
+        return task
+
+    def submit_task(self, task: Dict[str, Any], session_id: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Queue a task for a Celery worker to route, returning (task_id, celery_id) right away
+
+        The worker records status, history and the result artifact on the task in Redis; poll
+        them with get_task. Needs celery installed and a broker (CELERY_BROKER_URL or REDIS_URL).
+        """
+        from orchestration.tasks import run_agent_task
+        if run_agent_task is None:
+            raise RuntimeError("Task queue unavailable: install celery and set CELERY_BROKER_URL or REDIS_URL")
+        if self.redis is None:
+            raise RuntimeError("Task queue unavailable: REDIS_URL must be set so workers can record results")
+        a2a_task = self.create_task(task.get("content", ""), session_id)
+        # The worker owns the task from here; reads go to Redis so they see its updates
+        with self._tasks_lock:
+            del self.tasks[a2a_task.id]
+        celery_result = run_agent_task.delay(a2a_task.id, task, self.user_id)
+        return a2a_task.id, celery_result.id
+
+    @staticmethod
+    def _task_key(task_id: str) -> str:
+        return f"task:{task_id}"
+
+    def _store_task(self, task: Task):
+        # Writes the whole record, so only for new tasks; updates go through _update_field
+        if not self.redis:
+            return
+        try:
+            pipe = self.redis.pipeline()
+            pipe.hset(self._task_key(task.id), mapping={
+                "session_id": task.session_id,
+                "message": task.message,
+                "status": _dumps(_status_record(task.status)),
+                "history": _dumps(task.history),
+                "artifacts": _dumps(task.artifacts),
+                "metadata": _dumps(task.metadata)
+            })
+            pipe.expire(self._task_key(task.id), TASK_TTL_SECONDS)
+            pipe.execute()
+        except Exception as e:
+            print(f"Warning: Redis task store failed: {e}")
+
+    def _update_field(self, task: Task, field: str, update) -> bool:
+        """
+        Apply update to one field (status, history or artifacts) of a task; call with task.lock held
+
+        update gets the field's current value as JSON data and returns the new value, or None to
+        leave the task unchanged. With Redis, the update is a WATCH/MULTI transaction on that one
+        hash field, so concurrent processes neither lose each other's writes nor overwrite the
+        fields they didn't change. Returns whether the task was updated.
+        """
+        value = self._update_stored_field(task, field, update) if self.redis else _MISS
+        if value is _MISS:
+            value = update(_field_record(task, field))
+            if value is not None and self.redis:
+                # Not in Redis (expired, or never stored); write this process's copy back
+                _set_field(task, field, value)
+                self._store_task(task)
+        if value is None:
+            return False
+        _set_field(task, field, value)
+        return True
+
+    def _update_stored_field(self, task: Task, field: str, update):
+        """update applied to the field in Redis: the new value, None if update declined, or _MISS
+        if the task has no record there or Redis failed"""
+        key = self._task_key(task.id)
+        try:
+            with self.redis.pipeline() as pipe:
+                while True:
+                    try:
+                        pipe.watch(key)
+                        raw = pipe.hget(key, field)
+                        if raw is None:
+                            pipe.unwatch()
+                            return _MISS
+                        value = update(_loads(raw))
+                        if value is None:
+                            pipe.unwatch()
+                            return None
+                        pipe.multi()
+                        pipe.hset(key, field, _dumps(value))
+                        pipe.expire(key, TASK_TTL_SECONDS)
+                        pipe.execute()
+                        return value
+                    except redis.WatchError:
+                        # Another process changed the record first; retry on its version
+                        continue
+        except Exception as e:
+            print(f"Warning: Redis task update failed: {e}")
+            return _MISS
+
+    def _load_task(self, task_id: str) -> Optional[Task]:
+        if not self.redis:
+            return None
+        try:
+            record = self.redis.hgetall(self._task_key(task_id))
+        except Exception as e:
+            print(f"Warning: Redis task lookup failed: {e}")
+            return None
+        if not record:
+            return None
+        task = Task(task_id, record["session_id"], record["message"])
+        task.status = TaskStatus(**_loads(record["status"]))
+        task.history = _loads(record["history"])
+        task.artifacts = _loads(record["artifacts"])
+        task.metadata = _loads(record["metadata"])
+        return task
     
-    def route_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
+    def _start_routing_trace(self, task: Dict[str, Any]):
+        if not self.langfuse:
+            return None
+        try:
+            return self.langfuse.trace(
+                name="task-routing",
+                user_id=self.user_id,
+                metadata={
+                    "task_type": task.get("type", "general"),
+                    "task_content_length": len(task.get("content", ""))
+                }
+            )
+        except Exception as e:
+            print(f"Warning: Failed to create Langfuse trace: {e}")
+            return None
+
+    def route_task(self, task: Dict[str, Any], cache: bool = True) -> Dict[str, Any]:
         """
         Route a task to the appropriate agent based on task type
+
+        Successful analysis results are cached for an hour by task contents, so repeating an
+        analysis does not call the analyzer again. Research results are not: they come from live
+        APIs whose own caches expire within minutes (see ExternalAPIs). Neither are the expert's,
+        since its answers also depend on the context history it builds up between calls. A burst
+        of identical tasks of any type shares a single agent call; pass cache=False to always route.
         """
+        if not cache:
+            return self._route_task(task)
+        key = _task_cache_key(task)
+        result = self._route_cache.get(key)
+        if result is not _MISS:
+            return _copy_route(result)
+        with self._inflight_lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = Future()
+        if not leader:
+            return _copy_route(flight.result())
+        try:
+            result = self._route_task(task)
+            self._cache_route(key, task, result)
+            flight.set_result(_copy_route(result))
+            return result
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def _cache_route(self, key: str, task: Dict[str, Any], result: Dict[str, Any]):
+        if task.get("type") != "analysis":
+            return
+        # Agent failures are reported in the result rather than raised; don't keep those
+        if not (isinstance(result["result"], dict) and "error" in result["result"]):
+            self._route_cache.set(key, _copy_route(result))
+
+    def _route_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
         # Start Langfuse trace if available
-        trace = None
-        if self.langfuse:
-            try:
-                trace = self.langfuse.trace(
-                    name="task-routing",
-                    user_id=self.user_id,
-                    metadata={
-                        "task_type": task.get("type", "general"),
-                        "task_content_length": len(task.get("content", ""))
-                    }
-                )
-            except Exception as e:
-                print(f"Warning: Failed to create Langfuse trace: {e}")
-        
+        self._start_routing_trace(task)
         task_type = task.get("type", "general")
+        with self._agent_slot(self._TASK_AGENTS.get(task_type, "expert")):
+            # Unknown task types go to the expert as general queries
+            return self._handlers.get(task_type, self._handle_general)(task)
+
+    @contextmanager
+    def _agent_slot(self, agent: str):
+        """Hold one of the agent's concurrency slots, waiting for one to free up if needed"""
+        slots = self._agent_slots[agent]
+        slots.acquire()
+        try:
+            yield
+        finally:
+            slots.release()
+
+    @asynccontextmanager
+    async def _agent_slot_async(self, agent: str):
+        """Async form of _agent_slot; waits for a slot in _SLOT_WAIT_EXECUTOR, not on the event loop"""
+        slots = self._agent_slots[agent]
+        if not slots.acquire(blocking=False):
+            acquiring = asyncio.get_running_loop().run_in_executor(_SLOT_WAIT_EXECUTOR, slots.acquire)
+            try:
+                await asyncio.shield(acquiring)
+            except asyncio.CancelledError:
+                # The thread still takes the slot; hand it back once it does
+                acquiring.add_done_callback(lambda _: slots.release())
+                raise
+        try:
+            yield
+        finally:
+            slots.release()
+
+    def _handle_research(self, task: Dict[str, Any]) -> Dict[str, Any]:
         content = task.get("content", "")
-        
+        if task.get("auto_api_selection", True):
+            # Let the agent automatically decide which APIs to use
+            result = self.researcher.execute_task(content, auto_api_selection=True)
+        else:
+            # Use manual API selection
+            result = self.researcher.execute_task(
+                content,
+                auto_api_selection=False,
+                **{option: task.get(option, default) for option, default in _MANUAL_API_OPTIONS}
+            )
+        return {"agent": "researcher", "result": result}
+
+    def _handle_analysis(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        input_data = {
+            "task": task.get("content", ""),
+            "data": task.get("data", [])
+        }
+        return {"agent": "analyzer", "result": self.analyzer.process_input(input_data, user_id=self.user_id)}
+
+    def _handle_expert(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        result = self.expert.respond_to_query(task.get("content", ""), task.get("context", ""), user_id=self.user_id)
+        return {"agent": "expert", "result": result}
+
+    def _handle_general(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        return {"agent": "expert", "result": self.expert.respond_to_query(task.get("content", ""), user_id=self.user_id)}
+    
+    def route_task_stream(self, task: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        Like route_task, but yields the answer while it is being generated
+
+        Yields {"delta": text} chunks, then a single {"result": ...} chunk holding what route_task
+        would have returned. Expert and general queries stream token by token and analyses section
+        by section; research tasks (CrewAI does not stream) only yield the result.
+        """
+        task_type = task.get("type", "general")
         if task_type == "research":
-            # Route to researcher agent
-            auto_api_selection = task.get("auto_api_selection", True)
-            
-            if auto_api_selection:
-                # Let the agent automatically decide which APIs to use
-                result = self.researcher.execute_task(content, auto_api_selection=True)
-            else:
-                # Use manual API selection
-                use_web_search = task.get("use_web_search", False)
-                use_news = task.get("use_news", False)
-                use_weather = task.get("use_weather", False)
-                use_geolocation = task.get("use_geolocation", False)
-                use_stock_data = task.get("use_stock_data", False)
-                use_wikipedia = task.get("use_wikipedia", False)
-                city = task.get("city")
-                ip_address = task.get("ip_address")
-                stock_symbol = task.get("stock_symbol")
-                wikipedia_query = task.get("wikipedia_query")
-                
-                result = self.researcher.execute_task(
-                    content, 
-                    auto_api_selection=False,
-                    use_web_search=use_web_search,
-                    use_news=use_news,
-                    use_weather=use_weather,
-                    use_geolocation=use_geolocation,
-                    use_stock_data=use_stock_data,
-                    use_wikipedia=use_wikipedia,
-                    city=city,
-                    ip_address=ip_address,
-                    stock_symbol=stock_symbol,
-                    wikipedia_query=wikipedia_query
-                )
-            return {
-                "agent": "researcher",
-                "result": result
-            }
-            
-        elif task_type == "analysis":
-            # Route to analyzer agent
-            input_data = {
-                "task": content,
-                "data": task.get("data", [])
-            }
-            result = self.analyzer.process_input(input_data, user_id=self.user_id)
-            return {
-                "agent": "analyzer",
-                "result": result
-            }
-            
-        elif task_type == "expert_query":
-            # Route to expert agent
-            context = task.get("context", "")
-            result = self.expert.respond_to_query(content, context, user_id=self.user_id)
-            return {
-                "agent": "expert",
-                "result": result
-            }
-            
+            yield {"result": self.route_task(task)}
+            return
+        self._start_routing_trace(task)
+        if task_type == "analysis":
+            yield from self._stream_analysis(task)
         else:
-            # Default routing - send to expert for general queries
-            result = self.expert.respond_to_query(content, user_id=self.user_id)
-            return {
-                "agent": "expert",
-                "result": result
+            context = task.get("context", "") if task_type == "expert_query" else ""
+            yield from self._stream_expert(task.get("content", ""), context)
+
+    def _stream_expert(self, query: str, context: str) -> Iterator[Dict[str, Any]]:
+        parts = []
+        for token in _iterate(self.expert.respond_to_query_stream(query, context, user_id=self.user_id)):
+            parts.append(token)
+            yield {"delta": token}
+        yield {"result": {
+            "agent": "expert",
+            "result": {
+                "content": "".join(parts),
+                "agent": self.expert.name,
+                "expertise": self.expert.expertise
             }
-    
+        }}
+
+    _SECTION_HEADINGS = {
+        "analysis": "**Analysis:**\n\n",
+        "recommendations": "\n\n**Recommendations:**\n\n"
+    }
+
+    def _stream_analysis(self, task: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        input_data = {
+            "task": task.get("content", ""),
+            "data": task.get("data", [])
+        }
+        sections = {}
+        for section, text in _iterate(self.analyzer.aprocess_input_stream(input_data, user_id=self.user_id)):
+            if section == "error":
+                yield {"result": {
+                    "agent": "analyzer",
+                    "result": {
+                        "error": text,
+                        "agent": self.analyzer.name,
+                        "capabilities": self.analyzer.capabilities
+                    }
+                }}
+                return
+            if section not in sections:
+                sections[section] = []
+                yield {"delta": self._SECTION_HEADINGS[section]}
+            sections[section].append(text)
+            yield {"delta": text}
+        yield {"result": {
+            "agent": "analyzer",
+            "result": {
+                "content": {
+                    "analysis": "".join(sections.get("analysis", [])),
+                    "recommendations": ["".join(sections.get("recommendations", []))]
+                },
+                "agent": self.analyzer.name,
+                "capabilities": self.analyzer.capabilities
+            }
+        }}
+
     def collaborative_task_execution(self, task_description: str, conversation_history: Optional[List] = None) -> Dict[str, Any]:
         """
         Execute a task collaboratively where all agents work together
+
+        Turns are only ever appended to conversation_history; earlier turns are left untouched so
+        a conversation keeps a stable prefix (and the LLM provider's prompt cache stays warm).
+        The turns this call added are also returned on their own as "new_turns".
+        """
+        steps = self._collaboration_steps(task_description, conversation_history)
+        try:
+            agent_task = next(steps)
+            while True:
+                agent_task = steps.send(self.route_task(agent_task))
+        except StopIteration as done:
+            return done.value
+
+    async def collaborative_task_execution_async(self, task_description: str, conversation_history: Optional[List] = None) -> Dict[str, Any]:
+        """
+        Async variant of collaborative_task_execution
+
+        Each step depends on the one before it, so the agents still run one after another; the
+        steps are awaited through route_task_async, leaving the event loop free for other work.
+        """
+        steps = self._collaboration_steps(task_description, conversation_history)
+        try:
+            agent_task = next(steps)
+            while True:
+                agent_task = steps.send(await self.route_task_async(agent_task))
+        except StopIteration as done:
+            return done.value
+
+    def collaborative_task_execution_stream(self, task_description: str, conversation_history: Optional[List] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Like collaborative_task_execution, but streams the expert's recommendations
+
+        Research and analysis run to completion first; the expert's answer is then yielded as
+        {"delta": text} chunks, followed by one {"result": ...} chunk holding what
+        collaborative_task_execution would have returned.
+        """
+        steps = self._collaboration_steps(task_description, conversation_history)
+        research_task = next(steps)
+        analysis_task = steps.send(self.route_task(research_task))
+        expert_task = steps.send(self.route_task(analysis_task))
+        for chunk in self.route_task_stream(expert_task):
+            if "result" in chunk:
+                try:
+                    steps.send(chunk["result"])
+                except StopIteration as done:
+                    chunk = {"result": done.value}
+            yield chunk
+
+    def _collaboration_steps(self, task_description: str, conversation_history: Optional[List]):
+        """
+        The steps of a collaborative task, as a generator
+
+        It yields the research, analysis and expert tasks in turn and must be sent each one's
+        routed result; it records the task's history and artifacts along the way and returns the
+        collaborative result. Callers decide how the agent tasks are run (blocking, async, streamed).
         """
         # Start Langfuse trace if available
         trace = None
@@ -214,6 +784,7 @@ class A2AOrchestrator:
         
         if conversation_history is None:
             conversation_history = []
+        prior_turns = len(conversation_history)
         
         # Create A2A task
         task = self.create_task(task_description)
@@ -229,7 +800,7 @@ class A2AOrchestrator:
             "content": f"Research this topic comprehensively: {task_description}",
             "auto_api_selection": True
         }
-        research_result = self.route_task(research_task)
+        research_result = yield research_task
         
         # Add to conversation history
         conversation_history.append({
@@ -241,20 +812,11 @@ class A2AOrchestrator:
         self.add_task_history(task_id, {
             "role": "agent",
             "content": f"Research completed by {research_result['agent']}",
-            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+            "timestamp": _now_iso()
         })
         
         # Handle research content with proper error checking
-        research_content = research_result["result"]
-        if isinstance(research_content, dict):
-            if "content" in research_content:
-                research_content = research_content["content"]
-            elif "error" in research_content:
-                research_content = f"Error occurred: {research_content['error']}"
-            else:
-                research_content = str(research_content)
-        else:
-            research_content = str(research_content)
+        research_content = _result_content(research_result["result"])
         self.add_task_artifact(task_id, {
             "name": "Research Findings",
             "description": "Comprehensive research findings from the research agent",
@@ -271,7 +833,7 @@ class A2AOrchestrator:
                 "research_findings": research_content
             }
         }
-        analysis_result = self.route_task(analysis_task)
+        analysis_result = yield analysis_task
         
         # Add to conversation history
         conversation_history.append({
@@ -283,20 +845,11 @@ class A2AOrchestrator:
         self.add_task_history(task_id, {
             "role": "agent",
             "content": f"Analysis completed by {analysis_result['agent']}",
-            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+            "timestamp": _now_iso()
         })
         
         # Handle analysis content with proper error checking
-        analysis_content = analysis_result["result"]
-        if isinstance(analysis_content, dict):
-            if "content" in analysis_content:
-                analysis_content = analysis_content["content"]
-            elif "error" in analysis_content:
-                analysis_content = f"Error occurred: {analysis_content['error']}"
-            else:
-                analysis_content = str(analysis_content)
-        else:
-            analysis_content = str(analysis_content)
+        analysis_content = _result_content(analysis_result["result"])
         self.add_task_artifact(task_id, {
             "name": "Analysis Results",
             "description": "Data analysis and pattern recognition results",
@@ -309,9 +862,10 @@ class A2AOrchestrator:
         expert_task = {
             "type": "expert_query",
             "content": f"Based on the research and analysis, provide expert recommendations and strategic insights for: {task_description}",
-            "context": f"Research findings: {research_content}\n\nAnalysis results: {analysis_content}"
+            # Passed as sections, so the findings aren't copied into a context string of their own
+            "context": {"research": research_content, "analysis": analysis_content}
         }
-        expert_result = self.route_task(expert_task)
+        expert_result = yield expert_task
         
         # Add to conversation history
         conversation_history.append({
@@ -323,20 +877,11 @@ class A2AOrchestrator:
         self.add_task_history(task_id, {
             "role": "agent",
             "content": f"Expert recommendations provided by {expert_result['agent']}",
-            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+            "timestamp": _now_iso()
         })
         
         # Handle expert content with proper error checking
-        expert_content = expert_result["result"]
-        if isinstance(expert_content, dict):
-            if "content" in expert_content:
-                expert_content = expert_content["content"]
-            elif "error" in expert_content:
-                expert_content = f"Error occurred: {expert_content['error']}"
-            else:
-                expert_content = str(expert_content)
-        else:
-            expert_content = str(expert_content)
+        expert_content = _result_content(expert_result["result"])
         self.add_task_artifact(task_id, {
             "name": "Expert Recommendations",
             "description": "Strategic recommendations and expert insights",
@@ -353,50 +898,155 @@ class A2AOrchestrator:
             "expert": expert_result,
             "final_output": expert_content,
             "conversation_history": conversation_history,
+            "new_turns": conversation_history[prior_turns:],
             "task_id": task_id
         }
     
     def coordinate_agents(self, tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Coordinate multiple agents to handle a sequence of tasks
+
+        Tasks run concurrently, each as soon as the tasks it depends on have finished. A task may
+        list those as indices of earlier tasks under "dependencies"; by default research and
+        analysis tasks depend on nothing, and expert-bound tasks wait for every task before them
+        so they see the shared research and analysis context. Results keep the order of the tasks.
         """
-        results = []
-        
-        for task in tasks:
-            result = self.route_task(task)
-            results.append(result)
-            
-            # Share context between agents where appropriate
-            if result["agent"] == "researcher":
-                # Share research findings with the analyzer
-                research_content = result["result"]
-                if isinstance(research_content, dict):
-                    if "content" in research_content:
-                        research_content = research_content["content"]
-                    elif "error" in research_content:
-                        research_content = f"Error occurred: {research_content['error']}"
-                    else:
-                        research_content = str(research_content)
-                else:
-                    research_content = str(research_content)
-                self.analyzer.update_state("recent_research", research_content)
-                
-            elif result["agent"] == "analyzer":
-                # Share analysis with the expert
-                if isinstance(result["result"], dict):
-                    if "content" in result["result"]:
-                        analysis_content = result["result"]["content"]
-                    elif "error" in result["result"]:
-                        analysis_content = f"Error occurred: {result['result']['error']}"
-                    else:
-                        analysis_content = str(result["result"])
-                else:
-                    analysis_content = str(result["result"])
-                analysis_summary = analysis_content[:200] + "..." if len(analysis_content) > 200 else analysis_content
-                self.expert.add_to_context(f"Analysis result: {analysis_summary}")
-                
+        if not tasks:
+            return []
+        dependencies = [self._task_dependencies(tasks, i) for i in range(len(tasks))]
+        futures = []
+
+        def _run(i):
+            for dependency in dependencies[i]:
+                futures[dependency].result()
+            result = self.route_task(tasks[i])
+            self._share_context(result)
+            return result
+
+        # One worker per task, so a task waiting on its dependencies never starves them
+        with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+            for i in range(len(tasks)):
+                futures.append(executor.submit(_run, i))
+            return [future.result() for future in futures]
+
+    @staticmethod
+    def _task_dependencies(tasks: List[Dict[str, Any]], i: int) -> List[int]:
+        task = tasks[i]
+        if "dependencies" in task:
+            dependencies = list(task["dependencies"])
+            if any(not 0 <= dependency < i for dependency in dependencies):
+                raise ValueError(f"Task {i} can only depend on tasks before it, got {dependencies}")
+            return dependencies
+        if task.get("type") in ("research", "analysis"):
+            return []
+        return list(range(i))
+
+    async def route_task_async(self, task: Dict[str, Any], cache: bool = True) -> Dict[str, Any]:
+        """
+        Async variant of route_task; analysis and expert tasks use the agents' native async paths
+        """
+        if not cache:
+            return await self._route_task_async(task)
+        key = _task_cache_key(task)
+        result = self._route_cache.get(key)
+        if result is not _MISS:
+            return _copy_route(result)
+        # Futures belong to one event loop, so flights are tracked per loop
+        loop = asyncio.get_running_loop()
+        flight = self._ainflight.get((loop, key))
+        if flight is not None:
+            return _copy_route(await asyncio.shield(flight))
+        flight = self._ainflight[(loop, key)] = loop.create_future()
+        try:
+            result = await self._route_task_async(task)
+            self._cache_route(key, task, result)
+            flight.set_result(_copy_route(result))
+            return result
+        except BaseException as e:
+            flight.set_exception(e)
+            # Mark the exception retrieved in case no follower awaited this flight
+            flight.exception()
+            raise
+        finally:
+            self._ainflight.pop((loop, key), None)
+
+    async def _route_task_async(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        task_type = task.get("type", "general")
+        if task_type == "analysis":
+            self._start_routing_trace(task)
+            input_data = {
+                "task": task.get("content", ""),
+                "data": task.get("data", [])
+            }
+            async with self._agent_slot_async("analyzer"):
+                return {
+                    "agent": "analyzer",
+                    "result": await self.analyzer.aprocess_input(input_data, user_id=self.user_id)
+                }
+        if task_type == "research":
+            return await asyncio.to_thread(self._route_task, task)
+        self._start_routing_trace(task)
+        context = task.get("context", "") if task_type == "expert_query" else ""
+        async with self._agent_slot_async("expert"):
+            return {
+                "agent": "expert",
+                "result": await self.expert.respond_to_query_async(task.get("content", ""), context, user_id=self.user_id)
+            }
+
+    async def coordinate_agents_async(self, tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Concurrent variant of coordinate_agents
+
+        Tasks are scheduled from their dependencies exactly as coordinate_agents does, but run as
+        coroutines on the event loop. Results are returned in the same order as the tasks.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(tasks)
+        async for i, result in self.coordinate_agents_as_completed(tasks):
+            results[i] = result
         return results
 
+    async def coordinate_agents_as_completed(self, tasks: List[Dict[str, Any]]) -> AsyncIterator:
+        """
+        Run tasks as coordinate_agents_async does, yielding (index, result) as each one finishes
+        """
+        dependencies = [self._task_dependencies(tasks, i) for i in range(len(tasks))]
+        runs: List[asyncio.Task] = []
+
+        async def _run(i):
+            # A failed dependency fails the tasks waiting on it, as in coordinate_agents
+            for dependency in dependencies[i]:
+                await runs[dependency]
+            result = await self.route_task_async(tasks[i])
+            self._share_context(result)
+            return i, result
+
+        for i in range(len(tasks)):
+            runs.append(asyncio.ensure_future(_run(i)))
+        try:
+            for finished in asyncio.as_completed(runs):
+                yield await finished
+        finally:
+            # The caller stopped early or a task failed; don't leave the rest running, and mark
+            # failures past the first one as retrieved
+            for run in runs:
+                if not run.cancel() and not run.cancelled():
+                    run.exception()
+
+    def coordinate_agents_iter(self, tasks: List[Dict[str, Any]]) -> Iterator:
+        """
+        Sync form of coordinate_agents_as_completed, for callers without an event loop
+        """
+        return _iterate(self.coordinate_agents_as_completed(tasks))
+
+    def _share_context(self, result: Dict[str, Any]):
+        """Share a coordinated task's result with the agents that run after it"""
+        if result["agent"] == "analyzer":
+            # The expert's prompt is built from its own context history; structured analyses are
+            # summarized as text
+            analysis_content = str(_result_content(result["result"]))
+            analysis_summary = analysis_content[:200] + "..." if len(analysis_content) > 200 else analysis_content
+            self.expert.add_to_context(f"Analysis result: {analysis_summary}")
+
 # Example usage
 if __name__ == "__main__":
     # Create the orchestrator
@@ -426,5 +1076,8 @@ if __name__ == "__main__":
     # Print results
     for i, result in enumerate(results):
         print(f"Task {i+1} handled by {result['agent']}:")
-        print(json.dumps(result['result'], indent=2))
+        if orjson:
+            print(orjson.dumps(result['result'], default=_json_default, option=orjson.OPT_INDENT_2).decode())
+        else:
+            print(json.dumps(result['result'], indent=2, default=_json_default))
         print("-" * 50)
\ No newline at end of file
@@ -0,0 +1,58 @@
+import os
+import functools
+from dotenv import load_dotenv
+
+# celery is optional; without it tasks can only run in-process
+try:
+    from celery import Celery
+except ImportError:
+    Celery = None
+
+load_dotenv()
+
+BROKER_URL = os.getenv("CELERY_BROKER_URL") or os.getenv("REDIS_URL")
+
+app = Celery("a2a", broker=BROKER_URL, backend=BROKER_URL) if Celery and BROKER_URL else None
+
+if app and not os.getenv("A2A_ARTIFACT_DIR"):
+    # Workers write large results as artifact files the app must be able to read back
+    print("Warning: A2A_ARTIFACT_DIR is unset; large task artifacts are kept in a local temp directory "
+          "that other hosts can't read")
+
+# Orchestrators kept per worker process, least recently used dropped first; each holds its own
+# agents, route cache and task store
+MAX_ORCHESTRATORS = 16
+
+@functools.lru_cache(maxsize=MAX_ORCHESTRATORS)
+def _get_orchestrator(user_id: str):
+    """One orchestrator per recent user and worker process; the agent frameworks are expensive to build"""
+    from orchestration.a2a_orchestrator import A2AOrchestrator
+    return A2AOrchestrator(user_id=user_id)
+
+def _run_agent_task(self, task_id, task, user_id="default_user"):
+    """Route a queued task and record its outcome on the A2A task in Redis"""
+    from orchestration.a2a_orchestrator import TaskState
+    orchestrator = _get_orchestrator(user_id)
+    if not orchestrator.update_task_status(task_id, TaskState.WORKING, "Task picked up by worker"):
+        # Canceled, already finished, or unknown; nothing to do
+        return None
+    try:
+        result = orchestrator.route_task(task)
+    except Exception as e:
+        if self.request.retries < self.max_retries:
+            orchestrator.update_task_status(task_id, TaskState.WORKING, f"Retrying after error: {e}")
+            raise self.retry(exc=e, countdown=2 ** self.request.retries)
+        orchestrator.update_task_status(task_id, TaskState.FAILED, str(e), expected_prev=TaskState.WORKING)
+        raise
+    orchestrator.add_task_artifact(task_id, {
+        "name": "Result",
+        "description": f"Result from the {result['agent']} agent",
+        "content": result["result"],
+        "type": "application/json"
+    })
+    # A task canceled meanwhile stays canceled
+    orchestrator.update_task_status(task_id, TaskState.COMPLETED, f"Completed by {result['agent']}",
+                                    expected_prev=TaskState.WORKING)
+    return result
+
+run_agent_task = app.task(bind=True, max_retries=3)(_run_agent_task) if app else None